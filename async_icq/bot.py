@@ -1,31 +1,54 @@
 import os
 import io
-try:
-    import ujson as json
-except ImportError:
-    import json
+import copy
+import time
 import asyncio
+import inspect
 
 from types import MappingProxyType
 
-from uuid import uuid4
-
 import aiohttp
 
 from aiohttp import ClientResponse, FormData
 
 from aiologger import Logger
 from aiologger.levels import LogLevel
-from aiologger.formatters.base import Formatter
 
-from typing import Optional, Dict, List, Union, Coroutine
+from typing import (
+    Optional, Dict, List, Union, Iterable, Callable, Awaitable,
+    AsyncIterable, AsyncIterator, BinaryIO, Tuple
+)
 
 from threading import Thread
 
+from collections import OrderedDict
+
 from .events import Event, EventType
 from .helpers import InlineKeyboardMarkup, Format
 
+from . import codec
+from . import methods
+from .methods import Method, Query, build_query, query_value, \
+    keyboard_to_json, format_to_json
 from .middleware import BaseBotMiddleware
+from .dispatcher import Dispatcher, ChatDispatcher, Backpressure
+from .constant import DispatchMode, RequestPriority, BodyTransport
+from .router import Router
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, CircuitBreaker
+from .filecache import (
+    FileIdCache, INVALID_FILE_STATUSES, async_file_hash, bytes_hash
+)
+from .executor import HandlerExecutors, is_coroutine_handler
+from .checkpoint import Checkpointer
+from .metrics import Metrics, NULL_METRICS, handler_label
+from .log import RedactingFormatter, LogSampler, log_fields
+from .requestid import (
+    RequestId, RequestIdGenerator, RequestIdMethod, current_request_id
+)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
 
 
 def read_file(filepath: str) -> io.BytesIO:
@@ -44,36 +67,49 @@ async def async_read_file(filepath: str):
     return await loop.run_in_executor(None, read_file, filepath)
 
 
-def keyboard_to_json(
-        keyboard_markup: Union[
-            List[List[Dict]], InlineKeyboardMarkup, str, None
-        ]
-) -> Union[str, None]:
-    if isinstance(keyboard_markup, InlineKeyboardMarkup):
-        return keyboard_markup.to_json()
-    elif isinstance(keyboard_markup, list):
-        return json.dumps(keyboard_markup)
-    elif isinstance(keyboard_markup, str):
-        return keyboard_markup
-    elif keyboard_markup is None:
-        return keyboard_markup
-    else:
-        raise ValueError(
-            f'Unsupported type: keyboard_markup ({type(keyboard_markup)})')
-
-
-def format_to_json(format_: Union[Format, List[Dict], str]):
-    if isinstance(format_, Format):
-        return format_.to_json()
-    elif isinstance(format_, list):
-        return json.dumps(format_)
-    elif isinstance(format_, str):
-        return format_
-    elif format_ is None:
-        return format_
+FileInput = Union[str, bytes, bytearray, BinaryIO, AsyncIterable[bytes]]
+
+
+def open_file(filepath: str) -> BinaryIO:
+
+    assert os.path.exists(filepath), f'File "{filepath}" does\'nt exist'
+    assert os.path.isfile(filepath), f'"{filepath}" is not a file'
+
+    return open(filepath, 'rb')
+
+
+async def upload_form(
+        file: FileInput,
+        filename: Optional[str] = None
+) -> Tuple[FormData, Optional[BinaryIO]]:
+    """
+    Формирование multipart-формы для загрузки файла без чтения его
+    целиком в память: aiohttp отправляет файл частями по мере записи
+    :param file: путь к файлу, bytes, файловый объект
+    или асинхронный итератор по частям файла
+    :param filename: имя файла, по умолчанию берется из пути
+    :return: форма и открытый файл, который нужно закрыть после отправки
+    """
+    opened = None
+
+    if isinstance(file, str):
+        loop = asyncio.get_event_loop()
+        opened = await loop.run_in_executor(None, open_file, file)
+        filename = filename or os.path.basename(file)
+        value = opened
+    elif isinstance(file, (bytes, bytearray, memoryview)):
+        value = file
+    elif hasattr(file, 'read'):
+        filename = filename or os.path.basename(getattr(file, 'name', ''))
+        value = file
+    elif hasattr(file, '__aiter__'):
+        value = file
     else:
-        raise ValueError(
-            f'Unsupported type: format_ ({type(format_)})')
+        raise ValueError(f'Unsupported type: file ({type(file)})')
+
+    data = FormData(quote_fields=False)
+    data.add_field('file', value, filename=filename or 'file')
+    return data, opened
 
 
 class AsyncBot(object):
@@ -82,17 +118,47 @@ class AsyncBot(object):
         "loop",
         "url",
         "session",
+        "poll_session",
         "base_url",
         "parseMode",
         "token",
         "proxy",
         "logger",
+        "log_sampler",
+        "request_ids",
         "running",
         "handlers",
+        "router",
         "help",
         "middlewares",
         "lastEventId",
         "pollTime",
+        "dispatcher",
+        "drain_timeout",
+        "backpressure",
+        "connection_limit",
+        "connection_limit_per_host",
+        "keepalive_timeout",
+        "dns_cache_ttl",
+        "verify_ssl",
+        "request_timeout",
+        "poll_timeout",
+        "prefetch_events",
+        "rate_limiter",
+        "retry_policy",
+        "retry_policies",
+        "poll_breaker",
+        "file_cache",
+        "file_info_ttl",
+        "file_info_cache",
+        "connector",
+        "poll_connector",
+        "executors",
+        "checkpoint",
+        "metrics",
+        "poll_finished_at",
+        "body_transport",
+        "form_threshold",
         "__polling_thread"
     )
 
@@ -103,10 +169,41 @@ class AsyncBot(object):
             parseMode: str = 'HTML',
             proxy: Optional[str] = None,
             log_level: LogLevel = LogLevel.INFO,
+            log_sample_rate: float = 1.0,
+            request_id_generator: Optional[RequestIdGenerator] = None,
             middlewares: List[BaseBotMiddleware] = (),
             lastEventId: int = 0,
             pollTime: int = 30,
-            loop: Optional = None
+            loop: Optional = None,
+            max_concurrent_handlers: int = 100,
+            drain_timeout: Optional[float] = None,
+            pending_high_watermark: Optional[int] = 1000,
+            pending_low_watermark: Optional[int] = None,
+            dispatch_mode: DispatchMode = DispatchMode.PARALLEL,
+            chat_queue_size: int = 100,
+            chat_idle_timeout: float = 60.0,
+            connection_limit: int = 100,
+            connection_limit_per_host: int = 0,
+            keepalive_timeout: float = 15.0,
+            dns_cache_ttl: Optional[int] = 10,
+            verify_ssl: bool = False,
+            request_timeout: float = 30.0,
+            poll_timeout: Optional[float] = None,
+            prefetch_events: bool = True,
+            rate_limiter: Optional[RateLimiter] = None,
+            retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+            retry_policies: Optional[Dict[str, Optional[RetryPolicy]]] = None,
+            poll_breaker: Optional[CircuitBreaker] = None,
+            file_cache: Optional[FileIdCache] = None,
+            file_info_ttl: float = 300.0,
+            connector: Optional[aiohttp.BaseConnector] = None,
+            poll_connector: Optional[aiohttp.BaseConnector] = None,
+            sync_handler_threads: int = 10,
+            sync_handler_processes: Optional[int] = None,
+            checkpoint: Optional[Checkpointer] = None,
+            metrics: Metrics = NULL_METRICS,
+            body_transport: BodyTransport = BodyTransport.AUTO,
+            form_threshold: int = 2048
     ):
 
         if loop is None:
@@ -120,152 +217,489 @@ class AsyncBot(object):
             self.loop = loop
 
         self.session = None
+        self.poll_session = None
         self.url: str = url
         self.base_url: str = f'{url}/bot/v1/'
         self.parseMode: str = parseMode
         self.token: str = token
         self.proxy: str = proxy
 
+        # Токен не попадает в лог, даже внутри текста ошибки с URL запроса
         self.logger = Logger.with_default_handlers(
             name='async-icq',
-            formatter=Formatter(
+            formatter=RedactingFormatter(
                 '%(name)s - '
                 '%(levelname)s - '
                 '%(module)s:%(funcName)s:%(lineno)d - '
-                '%(message)s'
+                '%(message)s',
+                secrets=[token]
             ),
             level=log_level
         )
+        self.log_sampler: LogSampler = LogSampler(log_sample_rate)
+        self.request_ids: RequestIdGenerator = \
+            request_id_generator or RequestIdGenerator()
 
         self.running = True
         self.handlers: List = []
+        self.router: Router = Router(self.handlers)
         self.help: List = []
-        self.middlewares: List[BaseBotMiddleware] = middlewares
+        # Каждый middleware и каждое событие привязаны к своему боту,
+        # несколько ботов в одном процессе не перехватывают события друг
+        # друга. Middleware, уже привязанный к другому боту (общие
+        # параметры BotPool), копируется
+        self.middlewares: List[BaseBotMiddleware] = [
+            self.bind_middleware(middleware) for middleware in middlewares
+        ]
 
         self.lastEventId = lastEventId
         self.pollTime = pollTime
 
+        if DispatchMode(dispatch_mode) == DispatchMode.PER_CHAT:
+            self.dispatcher = ChatDispatcher(
+                limit=max_concurrent_handlers,
+                queue_size=chat_queue_size,
+                idle_timeout=chat_idle_timeout
+            )
+        else:
+            self.dispatcher = Dispatcher(limit=max_concurrent_handlers)
+        self.drain_timeout = drain_timeout
+
+        # Поллинг приостанавливается, пока обработчики не разберут очередь
+        self.backpressure: Backpressure = Backpressure(
+            high_watermark=pending_high_watermark,
+            low_watermark=pending_low_watermark
+        )
+
+        self.connection_limit: int = connection_limit
+        self.connection_limit_per_host: int = connection_limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self.dns_cache_ttl: Optional[int] = dns_cache_ttl
+        self.verify_ssl: bool = verify_ssl
+        self.request_timeout: float = request_timeout
+        self.poll_timeout: float = poll_timeout \
+            if poll_timeout is not None else pollTime + 5
+        self.prefetch_events: bool = prefetch_events
+        self.rate_limiter: Optional[RateLimiter] = rate_limiter
+        self.retry_policy: Optional[RetryPolicy] = retry_policy
+        self.retry_policies: Dict[str, Optional[RetryPolicy]] = \
+            retry_policies or {}
+        self.poll_breaker: CircuitBreaker = poll_breaker or CircuitBreaker()
+        self.file_cache: Optional[FileIdCache] = file_cache
+        self.file_info_ttl: float = file_info_ttl
+
+        # Общие пулы соединений (например, в BotPool) бот не закрывает
+        self.connector: Optional[aiohttp.BaseConnector] = connector
+        self.poll_connector: Optional[aiohttp.BaseConnector] = poll_connector
+        self.file_info_cache: 'OrderedDict[str, Tuple[float, Dict]]' = \
+            OrderedDict()
+
+        # Синхронные обработчики выполняются вне event loop
+        self.executors: HandlerExecutors = HandlerExecutors(
+            threads=sync_handler_threads,
+            processes=sync_handler_processes
+        )
+
+        # Большой текст, format и клавиатура сообщения отправляются
+        # в теле POST-запроса, а не в URL
+        self.body_transport: BodyTransport = BodyTransport(body_transport)
+        self.form_threshold: int = form_threshold
+
+        # Поллинг продолжается с последнего обработанного события
+        self.checkpoint: Optional[Checkpointer] = checkpoint
+        if checkpoint is not None:
+            self.lastEventId = max(self.lastEventId, checkpoint.lastEventId)
+
+        self.metrics: Metrics = metrics
+        self.poll_finished_at: Optional[float] = None
+
         self.__polling_thread: Optional[Thread] = None
 
         # self.loop.run_until_complete(self.start_session())
 
-        BaseBotMiddleware.bot = self
-        Event.bot = self
-
         # gc.freeze()
         # gc.enable()
 
-    @staticmethod
-    def get_request_id() -> str:
+    def bind_middleware(
+            self,
+            middleware: BaseBotMiddleware
+    ) -> BaseBotMiddleware:
         """
-        Метод для создания уникального uuid запроса
-        :return: уникальный uuid запроса
+        Привязать middleware к боту
+        :param middleware: middleware из параметров бота
+        :return: тот же middleware или его копия, если он уже
+        привязан к другому боту
         """
-        return str(uuid4())
+        if middleware.bot is not None and middleware.bot is not self:
+            middleware = copy.copy(middleware)
+        middleware.bot = self
+        return middleware
 
-    @staticmethod
-    def loads(object) -> MappingProxyType:
+    def log_enabled(self, level: LogLevel) -> bool:
+        """
+        Попадет ли в лог запись уровня level
+        """
+        return self.logger.is_enabled_for(level)
 
-        return MappingProxyType(
-            json.loads(object)
+    # Метод для создания уникального идентификатора запроса (RequestId).
+    # Строка идентификатора формируется только при обращении к ней.
+    # Как и прежний @staticmethod, вызывается и без экземпляра бота
+    get_request_id = RequestIdMethod()
+
+    def create_connector(
+            self,
+            limit: Optional[int] = None
+    ) -> aiohttp.TCPConnector:
+        """
+        Создание пула соединений с настройками бота
+        :param limit: размер пула, по умолчанию connection_limit
+        :return: пул соединений
+        """
+        return aiohttp.TCPConnector(
+            limit=limit if limit is not None else self.connection_limit,
+            limit_per_host=self.connection_limit_per_host
+            if limit is None else 0,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl is not None,
+            ttl_dns_cache=self.dns_cache_ttl,
+            ssl=None if self.verify_ssl else False
+        )
+
+    def create_session(
+            self,
+            connector: Optional[aiohttp.BaseConnector] = None,
+            timeout: Optional[float] = None,
+            connector_owner: bool = True
+    ) -> aiohttp.ClientSession:
+        """
+        Фабрика HTTP-сессий бота
+        :param connector: пул соединений, по умолчанию создается новый
+        :param timeout: таймаут запросов по умолчанию в секундах
+        :param connector_owner: закрывать ли пул вместе с сессией
+        :return: HTTP-сессия
+        """
+        return aiohttp.ClientSession(
+            raise_for_status=True,
+            timeout=aiohttp.ClientTimeout(
+                total=timeout if timeout is not None
+                else self.request_timeout
+            ),
+            json_serialize=codec.dumps,
+            connector=connector
+            if connector is not None else self.create_connector(),
+            connector_owner=connector_owner
         )
 
-    async def get(self, path: str, **kwargs) -> ClientResponse:
+    async def start_session(self) -> aiohttp.ClientSession:
         """
-        Функция для создания и логирования GET-запроса
-        :param path: относительный path запроса
-        :param kwargs: параметры GET-запроса
-        :return: ответ сервера
+        Создание HTTP-сессии бота, если она еще не создана
+        :return: HTTP-сессия
         """
+        if self.session is None or self.session.closed:
+            self.session = self.create_session(
+                connector=self.connector,
+                connector_owner=self.connector is None
+            )
+        return self.session
 
-        if self.session is None:
-            self.session: aiohttp.ClientSession = aiohttp.ClientSession(
-                base_url=self.url,
-                raise_for_status=True,
-                timeout=aiohttp.ClientTimeout(total=self.pollTime + 5),
-                json_serialize=json.dumps,
-                loop=asyncio.get_event_loop(),
-                connector=aiohttp.TCPConnector(verify_ssl=False)
+    async def start_poll_session(self) -> aiohttp.ClientSession:
+        """
+        Создание отдельной HTTP-сессии для long-poll запросов events/get
+        с собственным соединением, не пересекающимся с пулом отправки
+        :return: HTTP-сессия поллинга
+        """
+        if self.poll_session is None or self.poll_session.closed:
+            self.poll_session = self.create_session(
+                connector=self.poll_connector
+                or self.create_connector(limit=1),
+                timeout=self.poll_timeout,
+                connector_owner=self.poll_connector is None
             )
+        return self.poll_session
 
-        request_id = self.get_request_id()
+    async def close(self):
+        """
+        Закрытие HTTP-сессий бота и всех их соединений
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        if self.poll_session is not None:
+            await self.poll_session.close()
+            self.poll_session = None
+        self.executors.shutdown(wait=False)
+        if self.file_cache is not None:
+            await self.file_cache.flush()
+        await self.metrics.close()
 
-        params = {
-            'token': self.token
-        }
+    async def __aenter__(self) -> 'AsyncBot':
+        await self.start_session()
+        await self.metrics.start()
+        return self
 
-        params.update(kwargs)
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
-        for key, value in params.copy().items():
+    def retry_policy_for(self, path: str) -> Optional[RetryPolicy]:
+        """
+        Политика повторов для метода Bot API
+        :param path: относительный path запроса
+        :return: политика повторов или None, если повторы отключены
+        """
+        return self.retry_policies.get(path, self.retry_policy)
 
-            if value is None:
-                params.pop(key)
+    async def call(
+            self,
+            method: Method,
+            data: Union[
+                FormData, Query, Dict[str, str], Dict[str, io.BytesIO]
+            ] = None,
+            timeout: Optional[float] = None,
+            session: Optional[aiohttp.ClientSession] = None,
+            **kwargs
+    ) -> ClientResponse:
+        """
+        Вызов метода Bot API из таблицы methods
+        :param method: описание метода
+        :param data: тело запроса, при наличии запрос отправляется POST.
+        Без тела текст, format и клавиатура метода переносятся в форму
+        POST-запроса по body_transport и form_threshold
+        :param timeout: таймаут запроса в секундах,
+        по умолчанию request_timeout
+        :param session: HTTP-сессия GET-запроса, по умолчанию сессия отправки
+        :param kwargs: значения параметров метода, None не передаются
+        :return: ответ сервера
+        """
+        query = method.build(self.token, kwargs)
 
-        await self.logger.debug(
-            f'[GET][{request_id}] /bot/v1/{path} params - {kwargs} ->'
-        )
+        if data is None and method.body and self.use_form(method, query):
+            query, data = method.split(query)
 
-        response = await self.session.get(
-            url=f'/bot/v1/{path}',
-            params=params,
-            proxy=self.proxy
-        )
-        await self.logger.debug(
-            f'[{response.status}] <- [{request_id}] /bot/v1/{path}'
+        if data is not None or method.verb == 'POST':
+            return await self.post(
+                method.path, data=data, timeout=timeout, query=query)
+
+        return await self.get(
+            method.path, timeout=timeout, session=session, query=query)
+
+    def use_form(self, method: Method, query: Query) -> bool:
+        """
+        Передавать ли текст, format и клавиатуру в теле POST-запроса
+        :param method: описание метода
+        :param query: параметры запроса
+        :return: True - тело формы, False - строка запроса
+        """
+        if self.body_transport == BodyTransport.FORM:
+            return True
+        if self.body_transport == BodyTransport.QUERY:
+            return False
+        return method.body_size(query) >= self.form_threshold
+
+    async def get(
+            self,
+            path: str,
+            timeout: Optional[float] = None,
+            session: Optional[aiohttp.ClientSession] = None,
+            query: Optional[Query] = None,
+            **kwargs
+    ) -> ClientResponse:
+        """
+        Функция для создания и логирования GET-запроса
+        :param path: относительный path запроса
+        :param timeout: таймаут запроса в секундах,
+        по умолчанию request_timeout
+        :param session: HTTP-сессия запроса, по умолчанию сессия отправки
+        :param query: готовые параметры запроса (Method.build),
+        иначе параметры собираются из kwargs
+        :param kwargs: параметры GET-запроса
+        :return: ответ сервера
+        """
+
+        # Лимиты и повторы применяются только к запросам через пул отправки,
+        # поллинг events/get управляет ими сам
+        send_pool = session is None
+
+        if send_pool:
+            session = await self.start_session()
+
+        if query is None:
+            query = build_query(self.token, kwargs)
+
+        return await self._request(
+            'GET',
+            path,
+            query,
+            lambda request_id: session.get(
+                url=f'{self.base_url}{path}',
+                params=query,
+                proxy=self.proxy,
+                trace_request_ctx=request_id,
+                timeout=aiohttp.ClientTimeout(
+                    total=timeout
+                    if timeout is not None else self.request_timeout
+                )
+            ),
+            policy=self.retry_policy_for(path) if send_pool else None,
+            limited=send_pool
         )
-        return response
 
     async def post(
             self,
             path: str,
-            data: Union[FormData, Dict[str, str], Dict[str, io.BytesIO]] = None,
+            data: Union[
+                FormData, Query, Dict[str, str], Dict[str, io.BytesIO]
+            ] = None,
+            timeout: Optional[float] = None,
+            query: Optional[Query] = None,
             **kwargs
     ) -> ClientResponse:
         """
         Функция для создания и логирования POST-запроса
         :param path: относительный path запроса
-        :param data:
+        :param data: тело запроса: файлы (FormData) или поля формы (Query)
+        :param timeout: таймаут запроса в секундах,
+        по умолчанию request_timeout
+        :param query: готовые параметры запроса (Method.build),
+        иначе параметры собираются из kwargs
         :param kwargs: параметры POST-запроса
         :return: ответ сервера
         """
 
-        if self.session is None:
-            self.session: aiohttp.ClientSession = aiohttp.ClientSession(
-                base_url=self.url,
-                raise_for_status=True,
-                timeout=aiohttp.ClientTimeout(total=self.pollTime + 5),
-                json_serialize=json.dumps,
-                loop=asyncio.get_event_loop(),
-                connector=aiohttp.TCPConnector(verify_ssl=False)
-            )
+        session = await self.start_session()
+
+        if query is None:
+            query = build_query(self.token, kwargs)
+
+        # Тело запроса (файл) нельзя отправить повторно,
+        # поля формы (Query) кодируются заново при каждой попытке
+        policy = self.retry_policy_for(path) \
+            if data is None or isinstance(data, list) else None
+
+        return await self._request(
+            'POST',
+            path,
+            query,
+            lambda request_id: session.post(
+                url=f'{self.base_url}{path}',
+                params=query,
+                data=data,
+                proxy=self.proxy,
+                trace_request_ctx=request_id,
+                timeout=aiohttp.ClientTimeout(
+                    total=timeout
+                    if timeout is not None else self.request_timeout
+                )
+            ),
+            policy=policy,
+            form=[key for key, value in data]
+            if isinstance(data, list) else None
+        )
 
+    async def _request(
+            self,
+            method: str,
+            path: str,
+            query: Query,
+            send: Callable[[RequestId], Awaitable[ClientResponse]],
+            policy: Optional[RetryPolicy] = None,
+            limited: bool = True,
+            **log_extra
+    ) -> ClientResponse:
+        """
+        Выполнение запроса к Bot API: идентификатор запроса, лог,
+        rate limit, повторы по policy и метрики
+        :param method: HTTP-метод для лога и метрик
+        :param path: относительный path запроса
+        :param query: параметры запроса
+        :param send: отправка одной попытки запроса с идентификатором
+        :param policy: политика повторов, None - без повторов
+        :param limited: применять ли rate_limiter
+        :param log_extra: дополнительные поля записи лога запроса
+        :return: ответ сервера
+        """
         request_id = self.get_request_id()
 
-        params = {
-            'token': self.token
-        }
+        # Строка лога собирается, только если она попадет в лог
+        log_request = self.log_enabled(LogLevel.DEBUG) \
+            and self.log_sampler.sample()
 
-        params.update(kwargs)
+        if log_request:
+            await self.logger.debug(log_fields(
+                'request', method=method, path=path,
+                request_id=request_id, params=[
+                    (key, value) for key, value in query if key != 'token'
+                ], **log_extra
+            ))
 
-        for key, value in params.copy().items():
+        attempt = 0
 
-            if value is None:
-                params.pop(key)
+        # Идентификатор доступен трассировке и метрикам внутри запроса
+        token = current_request_id.set(request_id)
+        try:
+            while True:
+
+                if limited and self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(
+                        path, query_value(query, 'chatId'))
+
+                started = time.perf_counter()
+
+                try:
+                    response = await send(request_id)
+                    self.observe_request(
+                        method, path, started, response.status)
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                    self.observe_request(method, path, started, error)
+                    if policy is None \
+                            or not policy.should_retry(path, error, attempt):
+                        raise
+                    delay = policy.retry_after(error, attempt)
+                    await self.logger.warning(log_fields(
+                        'retry', method=method, path=path,
+                        request_id=request_id, delay=round(delay, 2),
+                        error=error
+                    ))
+                    await asyncio.sleep(delay)
+                    attempt += 1
+        finally:
+            current_request_id.reset(token)
+
+        if log_request:
+            await self.logger.debug(log_fields(
+                'response', method=method, path=path,
+                request_id=request_id, status=response.status
+            ))
+        return response
 
-        self.logger.debug(
-            f'[POST][{request_id}] {path} kwargs - {kwargs} ->'
-        )
+    def observe_request(
+            self,
+            method: str,
+            path: str,
+            started: float,
+            status: Union[int, BaseException]
+    ):
+        """
+        Записать метрики запроса к Bot API
+        :param method: HTTP-метод
+        :param path: path метода Bot API
+        :param started: time.perf_counter() перед отправкой запроса
+        :param status: HTTP-статус ответа или ошибка запроса
+        """
+        if not self.metrics.enabled:
+            return
 
-        response = await self.session.post(
-                url=f'/bot/v1/{path}',
-                params=params,
-                data=data,
-                proxy=self.proxy
-        )
-        self.logger.debug(
-            f'<- [{response.status}][{request_id}]'
+        if isinstance(status, BaseException):
+            status = getattr(status, 'status', None) or type(status).__name__
+
+        self.metrics.observe(
+            'bot_api_request_seconds',
+            time.perf_counter() - started,
+            method=method,
+            path=path
         )
-        return response
+        self.metrics.inc(
+            'bot_api_responses_total', path=path, status=str(status))
 
     async def self_get(self,) -> ClientResponse:
         """
@@ -283,7 +717,7 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get('self/get')
+        return await self.call(methods.SELF_GET)
 
     async def send_text(
             self,
@@ -324,19 +758,15 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path='messages/sendText',
+        return await self.call(
+            methods.SEND_TEXT,
             chatId=chatId,
             text=text,
             replyMsgId=replyMsgId,
             forwardChatId=forwardChatId,
             forwardMsgId=forwardMsgId,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
-            format=_format
-            if isinstance(_format, str)
-            else format_to_json(_format),
+            inlineKeyboardMarkup=inlineKeyboardMarkup,
+            format=_format,
             parseMode=parseMode if parseMode is not None else self.parseMode
         )
 
@@ -381,27 +811,23 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path='messages/sendFile',
+        return await self.call(
+            methods.SEND_FILE,
             chatId=chatId,
             fileId=fileId,
             caption=caption,
             replyMsgId=replyMsgId,
             forwardChatId=forwardChatId,
             forwardMsgId=forwardMsgId,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
-            format=_format
-            if isinstance(_format, str)
-            else format_to_json(_format),
+            inlineKeyboardMarkup=inlineKeyboardMarkup,
+            format=_format,
             parseMode=parseMode if parseMode is not None else self.parseMode
         )
 
     async def send_file(
         self,
         chatId: str,
-        file_path: str,
+        file_path: FileInput,
         caption: Optional[str] = None,
         replyMsgId: Optional[List[int]] = None,
         forwardChatId: Optional[str] = None,
@@ -413,29 +839,312 @@ class AsyncBot(object):
     ) -> ClientResponse:
         """
         Метод для отправки сообщения с файлом по его file.
+
+        file_path может быть путем к файлу, bytes, открытым файловым
+        объектом или асинхронным итератором по частям файла.
+        Файл отправляется частями, без чтения целиком в память.
+
+        Если у бота задан file_cache, файл загружается на сервер
+        только при первой отправке, дальше отправляется по fileId.
         """
-        data = FormData(quote_fields=False)
-        data.add_field('file',
-                       await async_read_file(file_path),
-                       filename=filename or os.path.basename(file_path))
-        return await self.post(
-            path='messages/sendFile',
-            chatId=chatId,
-            data=data,
-            caption=caption,
-            replyMsgId=replyMsgId,
-            forwardChatId=forwardChatId,
-            forwardMsgId=forwardMsgId,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
-            format=_format
-            if isinstance(_format, str)
-            else format_to_json(_format),
-            parseMode=parseMode
-            if parseMode is not None
-            else self.parseMode
+        async def send_id(fileId: str) -> ClientResponse:
+            return await self.send_fileId(
+                chatId=chatId,
+                fileId=fileId,
+                caption=caption,
+                replyMsgId=replyMsgId,
+                forwardChatId=forwardChatId,
+                forwardMsgId=forwardMsgId,
+                inlineKeyboardMarkup=inlineKeyboardMarkup,
+                _format=_format,
+                parseMode=parseMode
+            )
+
+        async def upload() -> ClientResponse:
+            data, opened = await upload_form(file_path, filename)
+            try:
+                return await self.call(
+                    methods.SEND_FILE,
+                    data=data,
+                    chatId=chatId,
+                    caption=caption,
+                    replyMsgId=replyMsgId,
+                    forwardChatId=forwardChatId,
+                    forwardMsgId=forwardMsgId,
+                    inlineKeyboardMarkup=inlineKeyboardMarkup,
+                    format=_format,
+                    parseMode=parseMode
+                    if parseMode is not None
+                    else self.parseMode
+                )
+            finally:
+                if opened is not None:
+                    opened.close()
+
+        return await self.send_cached(
+            await self.file_cache_key('file', file_path), send_id, upload)
+
+    async def send_cached(
+            self,
+            cache_key: Optional[str],
+            send_id: Callable[[str], Awaitable[ClientResponse]],
+            upload: Callable[[], Awaitable[ClientResponse]]
+    ) -> ClientResponse:
+        """
+        Отправить файл по fileId из file_cache или загрузить его.
+        Пока файл загружается, другие отправки того же файла ждут
+        его fileId вместо повторной загрузки
+        :param cache_key: ключ файла в кэше, None - без кэша
+        :param send_id: отправка по fileId
+        :param upload: загрузка файла
+        :return: ответ сервера
+        """
+        if cache_key is None:
+            return await upload()
+
+        fileId = self.file_cache.get(cache_key)
+
+        pending = self.file_cache.uploads.get(cache_key)
+        if fileId is None and pending is not None:
+            await asyncio.shield(pending)
+            fileId = self.file_cache.get(cache_key)
+
+        if fileId is not None:
+            try:
+                return await send_id(fileId)
+            except aiohttp.ClientResponseError as error:
+                if error.status not in INVALID_FILE_STATUSES:
+                    raise
+                # fileId устарел, загружаем файл заново
+                self.file_cache.discard(cache_key, fileId)
+
+        loop = asyncio.get_event_loop()
+        uploaded = self.file_cache.uploads[cache_key] = loop.create_future()
+
+        try:
+            response = await upload()
+            await self.remember_fileId(cache_key, response)
+        finally:
+            # Ожидающие отправки берут fileId из кэша, а при ошибке
+            # загрузки загружают файл сами
+            if self.file_cache.uploads.get(cache_key) is uploaded:
+                del self.file_cache.uploads[cache_key]
+            uploaded.set_result(None)
+
+        return response
+
+    async def file_cache_key(
+            self,
+            kind: str,
+            file: FileInput
+    ) -> Optional[str]:
+        """
+        Ключ файла в file_cache.
+        Файловые объекты и итераторы не кэшируются
+        :param kind: тип загрузки: file или voice
+        :param file: загружаемый файл
+        :return: ключ или None, если кэш не используется
+        """
+        if self.file_cache is None:
+            return None
+        if isinstance(file, str):
+            digest = await async_file_hash(file)
+        elif isinstance(file, (bytes, bytearray, memoryview)):
+            digest = bytes_hash(file)
+        else:
+            return None
+        return self.file_cache.key(kind, digest)
+
+    async def remember_fileId(self, cache_key: str, response: ClientResponse):
+        """
+        Сохранить fileId загруженного файла в file_cache.
+        Тело ответа остается доступным для повторного чтения
+        :param cache_key: ключ файла в кэше
+        :param response: ответ сервера на загрузку файла
+        """
+        try:
+            fileId = codec.loads(await response.read()).get('fileId')
+        except (ValueError, AttributeError):
+            return
+        if fileId:
+            self.file_cache.set(cache_key, fileId)
+
+    async def broadcast(
+            self,
+            chatIds: Iterable[str],
+            send: Callable[[str], Awaitable[ClientResponse]],
+            concurrency: int = 20
+    ) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Выполнить запрос для каждого чата из списка
+        с ограничением количества одновременных запросов.
+
+        Запросы идут с приоритетом RequestPriority.BULK,
+        поэтому не задерживают ответы на callback query.
+        :param chatIds: список чатов
+        :param send: функция, отправляющая запрос в один чат
+        :param concurrency: количество одновременных запросов
+        :return: ответ сервера или ошибка для каждого чата
+        """
+        results: Dict[str, Union[Dict, Exception]] = {}
+        chats = iter(chatIds)
+
+        async def worker():
+            for chatId in chats:
+                try:
+                    response = await send(chatId)
+                    results[chatId] = codec.loads(await response.read())
+                except Exception as error:
+                    results[chatId] = error
+
+        with RateLimiter.priority(RequestPriority.BULK):
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+        return results
+
+    async def send_text_many(
+            self,
+            chatIds: Iterable[str],
+            text: str,
+            inlineKeyboardMarkup: Union[
+                List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
+            _format: Union[Format, List[Dict], str, None] = None,
+            parseMode: Optional[str] = None,
+            concurrency: int = 20
+    ) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Массовая рассылка текстового сообщения.
+        Кнопки и форматирование сериализуются один раз на всю рассылку
+        :param chatIds: список чатов или пользователей
+        :param text: Текст сообщения.
+        :param inlineKeyboardMarkup: Это массив массивов с описанием кнопок.
+        :param _format: Описание форматирования текста.
+        :param parseMode: Режим обработки форматирования из текста сообщения.
+        :param concurrency: количество одновременных запросов
+        :return: ответ сервера или ошибка для каждого чата. Пример:
+
+        {
+            "1234@chat.agent": {"msgId": "57883346846815032", "ok": true},
+            "user@example.com": ClientResponseError(...)
+        }
+        """
+        keyboard = keyboard_to_json(inlineKeyboardMarkup)
+        format_ = format_to_json(_format)
+
+        return await self.broadcast(
+            chatIds,
+            lambda chatId: self.send_text(
+                chatId=chatId,
+                text=text,
+                inlineKeyboardMarkup=keyboard,
+                _format=format_,
+                parseMode=parseMode
+            ),
+            concurrency=concurrency
+        )
+
+    async def send_fileId_many(
+            self,
+            chatIds: Iterable[str],
+            fileId: str,
+            caption: Optional[str] = None,
+            inlineKeyboardMarkup: Union[
+                List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
+            _format: Union[Format, List[Dict], str, None] = None,
+            parseMode: Optional[str] = None,
+            concurrency: int = 20
+    ) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Массовая рассылка ранее загруженного файла по его fileId
+        :param chatIds: список чатов или пользователей
+        :param fileId: Id ранее загруженного файла.
+        :param caption: Подпись к файлу.
+        :param inlineKeyboardMarkup: Это массив массивов с описанием кнопок.
+        :param _format: Описание форматирования текста.
+        :param parseMode: Режим обработки форматирования из текста сообщения.
+        :param concurrency: количество одновременных запросов
+        :return: ответ сервера или ошибка для каждого чата
+        """
+        keyboard = keyboard_to_json(inlineKeyboardMarkup)
+        format_ = format_to_json(_format)
+
+        return await self.broadcast(
+            chatIds,
+            lambda chatId: self.send_fileId(
+                chatId=chatId,
+                fileId=fileId,
+                caption=caption,
+                inlineKeyboardMarkup=keyboard,
+                _format=format_,
+                parseMode=parseMode
+            ),
+            concurrency=concurrency
+        )
+
+    async def send_file_many(
+            self,
+            chatIds: Iterable[str],
+            file_path: FileInput,
+            caption: Optional[str] = None,
+            inlineKeyboardMarkup: Union[
+                List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
+            _format: Union[Format, List[Dict], str, None] = None,
+            parseMode: Optional[str] = None,
+            concurrency: int = 20
+    ) -> Dict[str, Union[Dict, Exception]]:
+        """
+        Массовая рассылка файла.
+        Файл загружается один раз в первый доступный чат,
+        остальным чатам отправляется по полученному fileId
+        :param chatIds: список чатов или пользователей
+        :param file_path: Путь к файлу
+        :param caption: Подпись к файлу.
+        :param inlineKeyboardMarkup: Это массив массивов с описанием кнопок.
+        :param _format: Описание форматирования текста.
+        :param parseMode: Режим обработки форматирования из текста сообщения.
+        :param concurrency: количество одновременных запросов
+        :return: ответ сервера или ошибка для каждого чата
+        """
+        keyboard = keyboard_to_json(inlineKeyboardMarkup)
+        format_ = format_to_json(_format)
+
+        results: Dict[str, Union[Dict, Exception]] = {}
+        chats = iter(chatIds)
+        fileId = None
+
+        with RateLimiter.priority(RequestPriority.BULK):
+            for chatId in chats:
+                try:
+                    response = await self.send_file(
+                        chatId=chatId,
+                        file_path=file_path,
+                        caption=caption,
+                        inlineKeyboardMarkup=keyboard,
+                        _format=format_,
+                        parseMode=parseMode
+                    )
+                    results[chatId] = codec.loads(await response.read())
+                    fileId = results[chatId].get('fileId')
+                except Exception as error:
+                    results[chatId] = error
+                if fileId is not None:
+                    break
+
+        if fileId is None:
+            return results
+
+        results.update(
+            await self.send_fileId_many(
+                chats,
+                fileId=fileId,
+                caption=caption,
+                inlineKeyboardMarkup=keyboard,
+                _format=format_,
+                parseMode=parseMode,
+                concurrency=concurrency
+            )
         )
+        return results
 
     async def send_voiceId(
             self,
@@ -471,22 +1180,20 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path='messages/sendVoice',
+        return await self.call(
+            methods.SEND_VOICE,
             chatId=chatId,
             fileId=fileId,
             replyMsgId=replyMsgId,
             forwardChatId=forwardChatId,
             forwardMsgId=forwardMsgId,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
+            inlineKeyboardMarkup=inlineKeyboardMarkup,
         )
 
     async def send_voice(
         self,
         chatId: str,
-        file_path: str,
+        file_path: FileInput,
         caption: Optional[str] = None,
         replyMsgId: Optional[List[int]] = None,
         forwardChatId: Optional[str] = None,
@@ -494,30 +1201,53 @@ class AsyncBot(object):
         inlineKeyboardMarkup: Union[
                 List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
         _format: Union[Format, List[Dict], str, None] = None,
-        parseMode: Optional[str] = None
+        parseMode: Optional[str] = None,
+        filename: Optional[str] = None
     ) -> ClientResponse:
         """
         Метод для отправки сообщения с голосового сообщения по его file,
         он должен быть в формате aac, ogg или m4a.
+
+        file_path может быть путем к файлу, bytes, открытым файловым
+        объектом или асинхронным итератором по частям файла.
+        Файл отправляется частями, без чтения целиком в память.
+
+        Если у бота задан file_cache, файл загружается на сервер
+        только при первой отправке, дальше отправляется по fileId.
         """
-        return await self.post(
-            path='messages/sendVoice',
-            chatId=chatId,
-            data={'file': await async_read_file(file_path)},
-            caption=caption,
-            replyMsgId=replyMsgId,
-            forwardChatId=forwardChatId,
-            forwardMsgId=forwardMsgId,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
-            format=_format
-            if isinstance(_format, str)
-            else format_to_json(_format),
-            parseMode=parseMode
-            if parseMode is not None
-            else self.parseMode
-        )
+        async def send_id(fileId: str) -> ClientResponse:
+            return await self.send_voiceId(
+                chatId=chatId,
+                fileId=fileId,
+                replyMsgId=replyMsgId,
+                forwardChatId=forwardChatId,
+                forwardMsgId=forwardMsgId,
+                inlineKeyboardMarkup=inlineKeyboardMarkup
+            )
+
+        async def upload() -> ClientResponse:
+            data, opened = await upload_form(file_path, filename)
+            try:
+                return await self.call(
+                    methods.SEND_VOICE,
+                    data=data,
+                    chatId=chatId,
+                    caption=caption,
+                    replyMsgId=replyMsgId,
+                    forwardChatId=forwardChatId,
+                    forwardMsgId=forwardMsgId,
+                    inlineKeyboardMarkup=inlineKeyboardMarkup,
+                    format=_format,
+                    parseMode=parseMode
+                    if parseMode is not None
+                    else self.parseMode
+                )
+            finally:
+                if opened is not None:
+                    opened.close()
+
+        return await self.send_cached(
+            await self.file_cache_key('voice', file_path), send_id, upload)
 
     async def edit_text(
             self,
@@ -548,17 +1278,13 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path='messages/editText',
+        return await self.call(
+            methods.EDIT_TEXT,
             chatId=chatId,
             msgId=msgId,
             text=text,
-            inlineKeyboardMarkup=inlineKeyboardMarkup
-            if isinstance(inlineKeyboardMarkup, str)
-            else keyboard_to_json(inlineKeyboardMarkup),
-            format=_format
-            if isinstance(_format, str)
-            else format_to_json(_format),
+            inlineKeyboardMarkup=inlineKeyboardMarkup,
+            format=_format,
             parseMode=parseMode if parseMode is not None else self.parseMode
         )
 
@@ -585,8 +1311,8 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path="messages/deleteMessages",
+        return await self.call(
+            methods.DELETE_MESSAGES,
             chatId=chatId,
             msgId=msgId
         )
@@ -613,11 +1339,11 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path='messages/answerCallbackQuery',
+        return await self.call(
+            methods.ANSWER_CALLBACK_QUERY,
             queryId=queryId,
             text=text,
-            showAlert='true' if showAlert else 'false',
+            showAlert=showAlert,
             url=url
         )
 
@@ -652,12 +1378,12 @@ class AsyncBot(object):
             "sn": "681869378@chat.agent"
         }
         """
-        return await self.get(
-            path="chats/createChat",
+        return await self.call(
+            methods.CREATE_CHAT,
             name=name,
             about=about,
             rules=rules,
-            members=[{"sn": member} for member in members],
+            members=members,
             public=public,
             defaultRole=defaultRole,
             joinModeration=joinModeration
@@ -684,10 +1410,10 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path="chats/members/add",
+        return await self.call(
+            methods.ADD_MEMBERS,
             chatId=chatId,
-            members=[{"sn": member} for member in members],
+            members=members,
         )
 
     async def delete_members(
@@ -706,10 +1432,10 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path="chats/members/delete",
+        return await self.call(
+            methods.DELETE_MEMBERS,
             chatId=chatId,
-            members=[{"sn": member} for member in members],
+            members=members,
         )
 
     async def send_actions(
@@ -733,8 +1459,8 @@ class AsyncBot(object):
             "ok": true
         }
         """
-        return await self.get(
-            path="chats/sendActions",
+        return await self.call(
+            methods.SEND_ACTIONS,
             chatId=chatId,
             actions=actions,
         )
@@ -759,8 +1485,8 @@ class AsyncBot(object):
             "joinModeration": true
         }
         """
-        return await self.get(
-            path="chats/getInfo",
+        return await self.call(
+            methods.GET_CHAT_INFO,
             chatId=chatId,
         )
 
@@ -783,8 +1509,8 @@ class AsyncBot(object):
             ]
         }
         """
-        return await self.get(
-            path="chats/getAdmins",
+        return await self.call(
+            methods.GET_CHAT_ADMINS,
             chatId=chatId,
         )
 
@@ -800,8 +1526,8 @@ class AsyncBot(object):
          определенного лимита
         :return: Список пользователей чата
         """
-        return await self.get(
-            path="chats/getMembers",
+        return await self.call(
+            methods.GET_CHAT_MEMBERS,
             chatId=chatId,
             cursor=cursor
         )
@@ -815,8 +1541,8 @@ class AsyncBot(object):
         :param chatId: ID чата
         :return: Список заблокированных пользователей
         """
-        return await self.get(
-            path="chats/getBlockedUsers",
+        return await self.call(
+            methods.GET_BLOCKED_USERS,
             chatId=chatId,
         )
 
@@ -829,8 +1555,8 @@ class AsyncBot(object):
         :param chatId: ID чата
         :return: список пользователей
         """
-        return await self.get(
-            path="chats/getPendingUsers",
+        return await self.call(
+            methods.GET_PENDING_USERS,
             chatId=chatId,
         )
 
@@ -847,8 +1573,8 @@ class AsyncBot(object):
         :param delLastMessages: удалять ли сообщения пользователя
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/blockUser",
+        return await self.call(
+            methods.BLOCK_USER,
             chatId=chatId,
             userId=userId,
             delLastMessages=delLastMessages
@@ -865,8 +1591,8 @@ class AsyncBot(object):
         :param userId: ID пользователя
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/unblockUser",
+        return await self.call(
+            methods.UNBLOCK_USER,
             chatId=chatId,
             userId=userId,
         )
@@ -887,21 +1613,13 @@ class AsyncBot(object):
         хотят в чат вступить
         :return: результат запроса
         """
-        if everyone:
-            return await self.get(
-                path="chats/resolvePending",
-                chatId=chatId,
-                approve=approve,
-                everyone=everyone
-            )
-        else:
-            return await self.get(
-                path="chats/resolvePending",
-                chatId=chatId,
-                approve=approve,
-                userId=userId,
-                everyone=everyone
-            )
+        return await self.call(
+            methods.RESOLVE_PENDING,
+            chatId=chatId,
+            approve=approve,
+            userId=None if everyone else userId,
+            everyone=everyone
+        )
 
     async def set_chat_title(
             self,
@@ -914,8 +1632,8 @@ class AsyncBot(object):
         :param title: новое название
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/setTitle",
+        return await self.call(
+            methods.SET_TITLE,
             chatId=chatId,
             title=title,
         )
@@ -931,8 +1649,8 @@ class AsyncBot(object):
         :param about: новое описание чата
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/setAbout",
+        return await self.call(
+            methods.SET_ABOUT,
             chatId=chatId,
             about=about,
         )
@@ -948,8 +1666,8 @@ class AsyncBot(object):
         :param rules: новые правила чата
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/setRules",
+        return await self.call(
+            methods.SET_RULES,
             chatId=chatId,
             rules=rules,
         )
@@ -965,8 +1683,8 @@ class AsyncBot(object):
         :param msgId: ID сообщения
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/pinMessage",
+        return await self.call(
+            methods.PIN_MESSAGE,
             chatId=chatId,
             msgId=msgId,
         )
@@ -982,8 +1700,8 @@ class AsyncBot(object):
         :param msgId: ID сообщения
         :return: результат запроса
         """
-        return await self.get(
-            path="chats/unpinMessage",
+        return await self.call(
+            methods.UNPIN_MESSAGE,
             chatId=chatId,
             msgId=msgId,
         )
@@ -997,15 +1715,148 @@ class AsyncBot(object):
         :param fileId: ID файла
         :return: информация о файле
         """
-        return await self.get(
-            path="files/getInfo",
+        return await self.call(
+            methods.GET_FILE_INFO,
             fileId=fileId
         )
 
+    async def file_info(self, fileId: str) -> Dict:
+        """
+        Информация о файле из files/getInfo, успешные ответы
+        кэшируются на file_info_ttl секунд
+        :param fileId: ID файла
+        :return: информация о файле. Пример:
+
+        {
+            "type": "image",
+            "size": 20971520,
+            "filename": "image.png",
+            "url": "https://example.com/get/88560d..."
+        }
+        """
+        now = asyncio.get_event_loop().time()
+
+        cached = self.file_info_cache.get(fileId)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        response = await self.get_file_info(fileId=fileId)
+        info = codec.loads(await response.read())
+
+        # Ошибка ({"ok": false} без url) не кэшируется
+        if not info.get('ok', True) or not info.get('url'):
+            return info
+
+        self.file_info_cache[fileId] = (now + self.file_info_ttl, info)
+        self.file_info_cache.move_to_end(fileId)
+        while len(self.file_info_cache) > 1024:
+            self.file_info_cache.popitem(last=False)
+
+        return info
+
+    async def open_file_stream(
+            self,
+            fileId: str,
+            offset: int = 0
+    ) -> ClientResponse:
+        """
+        Запрос содержимого файла через общую HTTP-сессию бота
+        :param fileId: ID файла
+        :param offset: с какого байта начать загрузку
+        :return: ответ сервера со статусом 200 или 206
+        """
+        info = await self.file_info(fileId)
+        session = await self.start_session()
+
+        return await session.get(
+            info['url'],
+            headers={'Range': f'bytes={offset}-'} if offset else None,
+            proxy=self.proxy,
+            timeout=aiohttp.ClientTimeout(
+                total=None, sock_read=self.request_timeout)
+        )
+
+    async def iter_file(
+            self,
+            fileId: str,
+            chunk_size: int = 256 * 1024,
+            offset: int = 0
+    ) -> AsyncIterator[bytes]:
+        """
+        Потоковая загрузка содержимого файла частями
+        :param fileId: ID файла
+        :param chunk_size: размер части в байтах
+        :param offset: с какого байта начать загрузку
+        :return: асинхронный итератор по частям файла
+        """
+        response = await self.open_file_stream(fileId, offset)
+
+        # Сервер не поддержал Range и отдает файл с начала
+        skip = offset if offset and response.status != 206 else 0
+
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk, skip = chunk[skip:], 0
+                yield chunk
+        finally:
+            response.release()
+
+    async def download_file(
+            self,
+            fileId: str,
+            dest: str,
+            chunk_size: int = 256 * 1024,
+            resume: bool = True
+    ) -> str:
+        """
+        Потоковая загрузка файла на диск без чтения целиком в память
+        :param fileId: ID файла
+        :param dest: путь к файлу или директории для сохранения,
+        для директории имя файла берется из files/getInfo
+        :param chunk_size: размер части в байтах
+        :param resume: продолжить загрузку, если файл уже частично скачан
+        :return: путь к скачанному файлу
+        """
+        if os.path.isdir(dest):
+            info = await self.file_info(fileId)
+            dest = os.path.join(
+                dest, os.path.basename(info.get('filename') or fileId))
+
+        offset = os.path.getsize(dest) \
+            if resume and os.path.isfile(dest) else 0
+
+        try:
+            response = await self.open_file_stream(fileId, offset)
+        except aiohttp.ClientResponseError as error:
+            if offset and error.status == 416:
+                # Файл уже скачан полностью
+                return dest
+            raise
+
+        if response.status != 206:
+            offset = 0
+
+        loop = asyncio.get_event_loop()
+        f = await loop.run_in_executor(
+            None, open, dest, 'ab' if offset else 'wb')
+
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                await loop.run_in_executor(None, f.write, chunk)
+        finally:
+            response.release()
+            await loop.run_in_executor(None, f.close)
+
+        return dest
+
     @staticmethod
     def loads(object, *args, **kwargs) -> MappingProxyType:
         return MappingProxyType(
-            json.loads(object)
+            codec.loads(object)
         )
 
     async def get_events(self):
@@ -1013,15 +1864,26 @@ class AsyncBot(object):
         Метод для поллинга событий от Bit API
         :return: Список событий
         """
-        response = await self.get(
-            path="events/get",
+        if self.metrics.enabled and self.poll_finished_at is not None:
+            self.metrics.observe(
+                'bot_poll_gap_seconds',
+                time.perf_counter() - self.poll_finished_at
+            )
+
+        response = await self.call(
+            methods.EVENTS_GET,
+            timeout=self.poll_timeout,
+            session=await self.start_poll_session(),
             lastEventId=self.lastEventId,
             pollTime=self.pollTime
         )
 
-        response_json = await response.json(
-            loads=self.loads
-        )
+        # Ответ разбирается сразу из bytes, без декодирования в str.
+        # Payload событий не оборачивается в MappingProxyType:
+        # Event делает это сам и только при обращении к event.data
+        response_json = codec.loads(await response.read())
+
+        self.poll_finished_at = time.perf_counter()
 
         if response_json.get('events', []):
 
@@ -1031,17 +1893,56 @@ class AsyncBot(object):
 
     async def handle_wrapper(self, handler, event: Event):
 
+        started = time.perf_counter()
+
         try:
-            await handler(event)
+            if is_coroutine_handler(handler):
+                await handler(event)
+            else:
+                await self.sync_handle_wrapper(handler, event)
         except Exception as error:
-            await self.logger.exception(error)
+            await self.handler_failed(handler, error)
+        finally:
+            if self.metrics.enabled:
+                self.metrics.observe(
+                    'bot_handler_seconds',
+                    time.perf_counter() - started,
+                    handler=handler_label(handler)
+                )
 
-    async def sync_handle_wrapper(self, handler, event: Event):
+    async def handler_failed(self, handler, error: Exception):
+        if self.metrics.enabled:
+            self.metrics.inc(
+                'bot_handler_errors_total', handler=handler_label(handler))
+        await self.logger.exception(error)
 
+    async def sync_handle_wrapper(self, handler, event: Event):
+        """
+        Выполнение синхронного обработчика в пуле потоков
+        или процессов, чтобы блокирующий код не останавливал поллинг
+        :param handler: синхронная функция обработки события
+        :param event: входящее событие
+        """
         try:
-            handler(self, event)
+            result = await self.executors.run(handler, event)
+            # Обертка без functools.wraps вернула корутину из потока
+            if inspect.isawaitable(result):
+                await result
         except Exception as error:
-            await self.logger.exception(error)
+            await self.handler_failed(handler, error)
+
+    def run_coroutine(self, coro: Awaitable, timeout: Optional[float] = None):
+        """
+        Выполнить корутину бота из синхронного обработчика,
+        например event.bot.run_coroutine(event.answer('text'))
+        :param coro: корутина, например метод бота или события
+        :param timeout: максимальное время ожидания в секундах
+        :return: результат корутины
+        """
+        if self.executors.loop is None:
+            raise RuntimeError('No sync handler is running')
+        return asyncio.run_coroutine_threadsafe(
+            coro, self.executors.loop).result(timeout)
 
     async def middleware_check(self, event_: Event):
         for middleware in self.middlewares:
@@ -1054,26 +1955,22 @@ class AsyncBot(object):
                     return True
         return False
 
-    def task_check(self, event_, handler, event_type, cmd) -> Optional[Coroutine]:
-
-        try:
-            if (event_type == event_.type and cmd is None) \
-                    or \
-                    (event_type == EventType.NEW_MESSAGE == event_.type \
-                     and event_.text.startswith(cmd)):
-                return self.handle_wrapper(
-                    handler=handler,
-                    event=event_
-                )
-        except Exception:
-            pass
-
     async def process_event(self, event: Event):
 
-        await self.logger.debug(event)
-
-        if await self.middleware_check(event):
-            yield
+        if self.log_enabled(LogLevel.DEBUG):
+            await self.logger.debug(log_fields(
+                'event', type=event.type.value, eventId=event.eventId))
+
+        if self.middlewares:
+            started = time.perf_counter()
+            rejected = await self.middleware_check(event)
+            if self.metrics.enabled:
+                self.metrics.observe(
+                    'bot_middleware_seconds', time.perf_counter() - started)
+                if rejected:
+                    self.metrics.inc('bot_middleware_rejected_total')
+            if rejected:
+                return
 
         if event.text is not None:
             if event.text == '/help':
@@ -1083,42 +1980,284 @@ class AsyncBot(object):
                 )
                 return
 
-        for part in filter(
-                lambda x: x is not None,
-                map(
-                    lambda x: self.task_check(
-                        event, *x,
-                    ),
-                    self.handlers
-                )
-        ):
-            yield part
+        for handler in self.router.match(event):
+            yield self.handle_wrapper(
+                handler=handler,
+                event=event
+            )
+
+    async def handle_event(self, event: Event):
+        """
+        Полная обработка одного события: middleware и все
+        подходящие обработчики по очереди
+        :param event: входящее событие
+        """
+        cancelled = False
+        try:
+            async for proccessed_event in self.process_event(event):
+                await proccessed_event
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as error:
+            await self.logger.exception(error)
+        finally:
+            self.backpressure.done()
+            # Прерванное при остановке (drain по таймауту) событие
+            # не фиксируется и будет обработано после перезапуска
+            if not cancelled and self.checkpoint is not None \
+                    and event.eventId is not None:
+                self.checkpoint.complete(event.eventId)
+
+    @staticmethod
+    def event_chat_id(event: Event) -> Optional[str]:
+        """
+        Получить chatId чата, к которому относится событие.
+        Для callbackQuery используется чат сообщения с кнопкой
+        :param event: входящее событие
+        :return: chatId или None
+        """
+        return AsyncBot.payload_chat_id(event.data)
+
+    @staticmethod
+    def payload_chat_id(payload: Dict) -> Optional[str]:
+        """
+        Получить chatId из payload события в формате Bot API
+        :param payload: payload события
+        :return: chatId или None
+        """
+        chat = payload.get('chat')
+
+        if chat is None:
+            chat = payload.get('message', {}).get('chat')
+
+        if chat is None:
+            return None
+
+        return chat.get('chatId')
+
+    async def dispatch_event(self, event: Event):
+        """
+        Передать событие в планировщик обработчиков
+        :param event: входящее событие
+        """
+        if isinstance(self.dispatcher, ChatDispatcher):
+            await self.dispatcher.schedule(
+                self.handle_event(event),
+                key=self.event_chat_id(event)
+            )
+        else:
+            await self.dispatcher.schedule(self.handle_event(event))
+
+    def build_event(self, event_: Dict) -> Event:
+        """
+        Проверить событие в формате Bot API и создать Event
+        :param event_: событие из events/get или от шлюза
+        :return: событие, привязанное к боту
+        :raises ValueError: неизвестный тип или неверный формат события
+        """
+        if not isinstance(event_, dict):
+            raise ValueError(f'Event must be an object: {type(event_)}')
+
+        eventId = event_.get("eventId")
+
+        if eventId is not None and (
+                not isinstance(eventId, int) or isinstance(eventId, bool)):
+            raise ValueError(f'Invalid eventId: {eventId!r}')
+
+        if not isinstance(event_.get("payload"), dict):
+            raise ValueError(f'Invalid payload of event {eventId}')
+
+        return Event(
+            type_=EventType(event_.get("type")),
+            data=event_["payload"],
+            bot=self,
+            eventId=eventId
+        )
+
+    async def skip_event(self, event_: Dict, error: ValueError):
+        """
+        Пропустить событие, которое не удалось разобрать
+        :param event_: событие в формате Bot API
+        :param error: ошибка разбора
+        """
+        await self.logger.warning(log_fields(
+            'invalid event', error=str(error), data=event_))
+
+        eventId = event_.get("eventId") if isinstance(event_, dict) else None
+
+        # Событие не обработается и после перезапуска: позиция
+        # не должна останавливаться на нем
+        if self.checkpoint is not None and isinstance(eventId, int) \
+                and not isinstance(eventId, bool) \
+                and not self.checkpoint.seen(eventId):
+            self.checkpoint.complete(eventId)
+
+    async def dispatch_events(self, events: List):
+        """
+        Передать пачку событий из events/get в планировщик обработчиков.
+        Событие неверного формата пропускается, не прерывая пачку
+        :param events: события в формате Bot API
+        """
+        parsed = []
+
+        for event_ in events:
+            try:
+                parsed.append(self.build_event(event_))
+            except ValueError as error:
+                await self.skip_event(event_, error)
+
+        await self.schedule_events(parsed)
+
+    async def schedule_events(self, events: List[Event]):
+        """
+        Передать проверенные события в планировщик обработчиков
+        :param events: события, созданные build_event
+        """
+        for event in events:
+
+            eventId = event.eventId
+
+            if self.checkpoint is not None and eventId is not None:
+                if self.checkpoint.seen(eventId):
+                    if self.log_enabled(LogLevel.DEBUG):
+                        await self.logger.debug(log_fields(
+                            'duplicate event', eventId=eventId))
+                    continue
+                self.checkpoint.begin(eventId)
+
+            self.backpressure.add()
+
+            if self.metrics.enabled:
+                self.metrics.inc('bot_events_total', type=event.type.value)
+
+            await self.dispatch_event(event)
+
+        if self.metrics.enabled:
+            self.observe_queues()
+
+    def observe_queues(self):
+        """
+        Записать глубину очередей бота в датчики метрик
+        """
+        self.metrics.set('bot_pending_events', self.backpressure.depth)
+        self.metrics.set('bot_handlers_in_flight', self.dispatcher.in_flight)
+        self.metrics.set('bot_handlers_pending', self.dispatcher.pending)
+        if self.rate_limiter is not None:
+            self.metrics.set(
+                'bot_rate_limit_queue', self.rate_limiter.queue_depth)
 
     async def start_polling(self):
         """
-        Функция поллинга и обработки событий
+        Функция поллинга и обработки событий.
+
+        Обработка каждого события запускается отдельной задачей
+        через self.dispatcher, поллинг продолжается, пока обработчики
+        выполняются. При остановке ожидает завершения начатых обработчиков.
         :return:
         """
-        while self.running:
+        try:
+            await self.poll_events(self.dispatch_events)
+        finally:
+            await self.dispatcher.drain(timeout=self.drain_timeout)
+            self.backpressure.reset()
+            if self.checkpoint is not None:
+                await self.checkpoint.close()
 
-            try:
-                for event_ in await self.get_events():
-                    event__ = Event(
-                        type_=EventType(event_["type"]),
-                        data=event_["payload"]
-                    )
-                    async for proccessed_event in self.process_event(event__):
-                        await proccessed_event
+    @property
+    def queue_depth(self) -> int:
+        """
+        Количество принятых событий, обработка которых не завершена
+        """
+        return self.backpressure.depth
+
+    async def wait_backpressure(self):
+        """
+        Дождаться, пока количество событий в обработке
+        не опустится до нижней границы
+        """
+        if not self.backpressure.paused:
+            return
 
-            except ValueError:
-                continue
+        await self.logger.warning(
+            f'Polling paused: {self.backpressure.depth} events pending'
+        )
+        await self.backpressure.wait()
+        await self.logger.info(
+            f'Polling resumed: {self.backpressure.depth} events pending'
+        )
 
-            except KeyboardInterrupt as error:
-                await self.logger.info(f'Stopping bot after {type(error)}')
-                break
+    async def poll_events(
+            self,
+            callback: Callable[[List], Awaitable[None]]
+    ):
+        """
+        Поллинг событий до остановки бота
+        :param callback: корутина, которой передается каждая пачка событий
+        в формате Bot API
+        """
+        poll: Optional[asyncio.Future] = None
 
-            except Exception as error:
-                await self.logger.exception(error)
+        try:
+            while self.running:
+
+                try:
+                    if poll is None:
+                        await self.wait_backpressure()
+                        poll = asyncio.ensure_future(self.get_events())
+
+                    task, poll = poll, None
+
+                    try:
+                        events = await task
+                    except Exception as error:
+                        # Ошибка поллинга: ждем вместо немедленного повтора
+                        await self.logger.exception(error)
+                        delay = self.poll_breaker.failure()
+                        if self.poll_breaker.is_open:
+                            await self.logger.warning(
+                                f'events/get failed '
+                                f'{self.poll_breaker.failures} times in a row, '
+                                f'next poll in {delay:.2f}s'
+                            )
+                        await asyncio.sleep(delay)
+                        continue
+
+                    self.poll_breaker.success()
+
+                    if self.prefetch_events and self.running \
+                            and not self.backpressure.paused:
+                        # Следующий long-poll идет, пока разбирается пачка
+                        poll = asyncio.ensure_future(self.get_events())
+
+                    await callback(events)
+
+                except ValueError as error:
+                    await self.logger.warning(log_fields(
+                        'invalid events batch', error=str(error)))
+                    continue
+
+                except KeyboardInterrupt as error:
+                    await self.logger.info(
+                        f'Stopping bot after {type(error)}')
+                    break
+
+                except Exception as error:
+                    await self.logger.exception(error)
+        finally:
+            if poll is not None:
+                if poll.done() and not poll.cancelled() \
+                        and poll.exception() is None:
+                    # События уже подтверждены сервером, их нужно обработать
+                    await callback(poll.result())
+                else:
+                    poll.cancel()
+
+    def stop(self):
+        """
+        Остановить поллинг после текущего запроса событий
+        """
+        self.running = False
 
     async def help_info(self, event: Event):
 
@@ -1128,29 +2267,68 @@ class AsyncBot(object):
 
         await event.answer(text)
 
-    def start_poll(self, threaded: bool = False):
+    async def run(self):
+        """
+        Поллинг событий с закрытием HTTP-сессии после остановки
+        """
+        async with self:
+            await self.start_polling()
+
+    def start_poll(self, threaded: bool = False, processes: int = 0):
         """
         Перегрузка функции поллинга и обрабоки событий
         :param threaded: выполнять функцию в основном потоке
 
         или запустить побочный
+        :param processes: количество рабочих процессов для обработчиков,
+        0 - обработка в текущем процессе, см. workers.WorkerPool
         :return:
         """
 
+        if processes:
+            from .workers import WorkerPool
+            WorkerPool(self, processes=processes).start()
+            return
+
         self.add_handler([self.help_info, EventType.NEW_MESSAGE, '/help'])
 
         if threaded:
 
             self.__polling_thread = Thread(
                 target=self.loop.run_until_complete,
-                args=[self.start_polling()],
+                args=[self.run()],
                 daemon=True
             )
             self.__polling_thread.start()
 
         else:
 
-            self.loop.run_until_complete(self.start_polling())
+            self.loop.run_until_complete(self.run())
+
+    def start_webhook(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 8080,
+            path: str = '/webhook',
+            secret: Optional[str] = None
+    ):
+        """
+        Прием событий от шлюза по HTTP вместо поллинга,
+        см. webhook.WebhookServer
+        :param host: адрес, на котором принимаются запросы,
+        по умолчанию только локальный
+        :param port: порт
+        :param path: путь endpoint-а
+        :param secret: общий секрет шлюза, обязателен для внешнего адреса
+        :return:
+        """
+        from .webhook import WebhookServer
+
+        self.add_handler([self.help_info, EventType.NEW_MESSAGE, '/help'])
+
+        self.loop.run_until_complete(WebhookServer(
+            self, host=host, port=port, path=path, secret=secret
+        ).serve())
 
     def add_handler(self, handler: List):
         """
@@ -1158,8 +2336,9 @@ class AsyncBot(object):
         :param handler:
         :return:
         """
-        if asyncio.iscoroutinefunction(handler[0]):
+        if callable(handler[0]):
             self.handlers.append(handler)
+            self.router.invalidate()
             if handler[0].__doc__:
                 if handler[1] == EventType.NEW_MESSAGE:
                     self.help.append([
@@ -1208,9 +2387,20 @@ class AsyncBot(object):
                     ])
         else:
             raise ValueError(
-                f'Added unsupported sync event handler: {handler[0].__name__}'
+                f'Added unsupported event handler: {handler[0]!r}'
             )
 
+    def remove_handler(self, handler):
+        """
+        Функция удаления обработчика событий
+        :param handler: функция-обработчик
+        :return:
+        """
+        self.handlers[:] = [
+            item for item in self.handlers if item[0] is not handler
+        ]
+        self.router.invalidate()
+
     def event_handler(self, event_type: EventType, cmd: Optional[str] = None):
         """
         Базовый декоратор для функции обработки события
@@ -0,0 +1,244 @@
+import os
+import json
+import asyncio
+import sqlite3
+
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+
+class CheckpointStore(object):
+    """
+    Хранилище позиции обработки событий: eventId, до которого
+    включительно все события обработаны, и eventId обработанных
+    событий после него
+    """
+
+    __slots__ = ()
+
+    def load(self) -> Tuple[int, List[int]]:
+        """
+        :return: последний обработанный eventId и eventId событий,
+        обработанных после него
+        """
+        raise NotImplementedError
+
+    def save(self, lastEventId: int, done: List[int]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Позиция в JSON-файле, файл заменяется атомарно
+    """
+
+    __slots__ = (
+        "path",
+        "fsync"
+    )
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        :param path: путь к файлу
+        :param fsync: сбрасывать файл на диск при каждом сохранении
+        """
+        self.path: str = path
+        self.fsync: bool = fsync
+
+    def load(self) -> Tuple[int, List[int]]:
+        if not os.path.isfile(self.path):
+            return 0, []
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+        return state['lastEventId'], state.get('done', [])
+
+    def save(self, lastEventId: int, done: List[int]):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'lastEventId': lastEventId, 'done': done}, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Позиция в базе SQLite, удобно, если рядом хранится состояние бота
+    """
+
+    __slots__ = (
+        "path",
+        "name",
+        "_connection"
+    )
+
+    def __init__(self, path: str, name: str = 'default'):
+        """
+        :param path: путь к файлу базы
+        :param name: имя позиции, позволяет хранить позиции
+        нескольких ботов в одной базе
+        """
+        self.path: str = path
+        self.name: str = name
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Сохранение выполняется в пуле потоков
+            self._connection = sqlite3.connect(
+                self.path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoint ('
+                'name TEXT PRIMARY KEY, '
+                'lastEventId INTEGER NOT NULL, '
+                'done TEXT NOT NULL)'
+            )
+        return self._connection
+
+    def load(self) -> Tuple[int, List[int]]:
+        row = self.connection.execute(
+            'SELECT lastEventId, done FROM checkpoint WHERE name = ?',
+            (self.name,)
+        ).fetchone()
+        if row is None:
+            return 0, []
+        return row[0], json.loads(row[1])
+
+    def save(self, lastEventId: int, done: List[int]):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO checkpoint (name, lastEventId, done) '
+                'VALUES (?, ?, ?)',
+                (self.name, lastEventId, json.dumps(done))
+            )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Checkpointer(object):
+    """
+    Фиксация позиции обработки событий после завершения обработчиков.
+
+    lastEventId сохраняется только тогда, когда обработаны все события
+    до него включительно, поэтому после перезапуска бот продолжает
+    с первого необработанного события. События, обработанные раньше
+    предыдущих (параллельная обработка), запоминаются отдельно
+    и не обрабатываются повторно. Сохранение выполняется пачками:
+    раз в interval секунд или каждые batch_size событий.
+    """
+
+    __slots__ = (
+        "store",
+        "interval",
+        "batch_size",
+        "dedup_size",
+        "lastEventId",
+        "pending",
+        "done",
+        "recent",
+        "dirty",
+        "saved_at",
+        "_flush"
+    )
+
+    def __init__(
+            self,
+            store: CheckpointStore,
+            interval: float = 1.0,
+            batch_size: int = 100,
+            dedup_size: int = 10000
+    ):
+        """
+        :param store: хранилище позиции
+        :param interval: максимальный интервал между сохранениями в секундах
+        :param batch_size: сохранять после стольких обработанных событий
+        :param dedup_size: сколько последних eventId помнить
+        для отбрасывания повторов
+        """
+        self.store: CheckpointStore = store
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.dedup_size: int = dedup_size
+
+        self.lastEventId, done = store.load()
+        self.pending: Set[int] = set()
+        self.done: Set[int] = set(done)
+        self.recent: 'OrderedDict[int, None]' = OrderedDict.fromkeys(done)
+        self.dirty: int = 0
+        self.saved_at: float = 0.0
+        self._flush: Optional[asyncio.Future] = None
+
+    def seen(self, eventId: int) -> bool:
+        """
+        Событие уже обработано или обрабатывается
+        """
+        return eventId <= self.lastEventId \
+            or eventId in self.pending \
+            or eventId in self.recent
+
+    def begin(self, eventId: int):
+        self.pending.add(eventId)
+
+    def complete(self, eventId: int):
+        """
+        Отметить событие обработанным и при необходимости
+        запустить сохранение позиции
+        """
+        self.pending.discard(eventId)
+
+        self.recent[eventId] = None
+        if len(self.recent) > self.dedup_size:
+            self.recent.popitem(last=False)
+
+        if self.pending and eventId > min(self.pending):
+            self.done.add(eventId)
+        else:
+            # Все события до eventId обработаны
+            self.lastEventId = max(self.lastEventId, eventId)
+            if self.done:
+                bound = min(self.pending) if self.pending else None
+                for done in sorted(self.done):
+                    if bound is not None and done > bound:
+                        break
+                    self.lastEventId = max(self.lastEventId, done)
+                    self.done.discard(done)
+
+        self.dirty += 1
+
+        loop = asyncio.get_event_loop()
+        if self.dirty >= self.batch_size \
+                or loop.time() - self.saved_at >= self.interval:
+            if self._flush is None or self._flush.done():
+                self._flush = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """
+        Сохранить позицию, запись на диск выполняется в пуле потоков
+        """
+        if not self.dirty:
+            return
+
+        loop = asyncio.get_event_loop()
+        self.dirty = 0
+        self.saved_at = loop.time()
+
+        await loop.run_in_executor(
+            None, self.store.save, self.lastEventId, sorted(self.done))
+
+    async def close(self):
+        """
+        Сохранить позицию и закрыть хранилище
+        """
+        if self._flush is not None:
+            await self._flush
+        await self.flush()
+        self.store.close()
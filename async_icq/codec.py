@@ -0,0 +1,89 @@
+import json
+
+from typing import Any, Callable, Dict, Optional, Union
+
+
+class Codec(object):
+    """
+    Пара функций сериализации JSON.
+    dumps всегда возвращает str, loads принимает str или bytes
+    """
+
+    __slots__ = (
+        "name",
+        "dumps",
+        "loads"
+    )
+
+    def __init__(
+            self,
+            name: str,
+            dumps: Callable[[Any], str],
+            loads: Callable[[Union[str, bytes]], Any]
+    ):
+        self.name: str = name
+        self.dumps: Callable[[Any], str] = dumps
+        self.loads: Callable[[Union[str, bytes]], Any] = loads
+
+    def __repr__(self):
+        return "Codec({self.name})".format(self=self)
+
+
+CODECS: Dict[str, Codec] = {
+    'json': Codec('json', json.dumps, json.loads)
+}
+
+try:
+    import ujson
+    CODECS['ujson'] = Codec('ujson', ujson.dumps, ujson.loads)
+except ImportError:
+    pass
+
+try:
+    import orjson
+
+    def _orjson_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    CODECS['orjson'] = Codec('orjson', _orjson_dumps, orjson.loads)
+except ImportError:
+    pass
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """
+    Получить кодек по имени, без имени - самый быстрый из установленных
+    :param name: orjson, ujson или json
+    :return: кодек
+    """
+    if name is not None:
+        try:
+            return CODECS[name]
+        except KeyError:
+            raise ValueError(f'JSON codec is not available: {name}')
+    for name in ('orjson', 'ujson', 'json'):
+        if name in CODECS:
+            return CODECS[name]
+
+
+codec: Codec = get_codec()
+
+
+def set_codec(name: str) -> Codec:
+    """
+    Выбрать кодек, которым библиотека сериализует запросы
+    и разбирает ответы
+    :param name: orjson, ujson или json
+    :return: выбранный кодек
+    """
+    global codec
+    codec = get_codec(name)
+    return codec
+
+
+def dumps(obj: Any) -> str:
+    return codec.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return codec.loads(data)
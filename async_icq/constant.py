@@ -1,4 +1,4 @@
-from enum import Enum, unique
+from enum import Enum, IntEnum, unique
 
 
 @unique
@@ -80,3 +80,29 @@ class StyleType(Enum):
     ORDERED_LIST = "ordered_list"
     UNORDERED_LIST = "unordered_list"
     QUOTE = "quote"
+
+
+@unique
+class DispatchMode(Enum):
+    PARALLEL = "parallel"
+    PER_CHAT = "per_chat"
+
+
+@unique
+class RequestPriority(IntEnum):
+    CALLBACK = 0
+    DEFAULT = 1
+    BULK = 2
+
+
+@unique
+class HandlerExecutor(Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+@unique
+class BodyTransport(Enum):
+    QUERY = "query"
+    FORM = "form"
+    AUTO = "auto"
@@ -0,0 +1,307 @@
+import asyncio
+
+from typing import Coroutine, Dict, Hashable, Optional, Set
+
+
+class Dispatcher(object):
+    """
+    Планировщик обработчиков событий.
+
+    Запускает корутины обработки как отдельные задачи,
+    ограничивая количество одновременно выполняемых обработчиков.
+    """
+
+    __slots__ = (
+        "limit",
+        "tasks",
+        "_semaphore"
+    )
+
+    def __init__(self, limit: int = 100):
+        if limit < 1:
+            raise ValueError(f'Dispatcher limit must be positive: {limit}')
+        self.limit: int = limit
+        self.tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Семафор создается лениво, чтобы привязаться к запущенному циклу
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Количество выполняющихся обработчиков
+        """
+        return len(self.tasks)
+
+    @property
+    def pending(self) -> int:
+        """
+        Количество событий, ожидающих запуска обработчика
+        """
+        return 0
+
+    async def schedule(self, coro: Coroutine) -> asyncio.Task:
+        """
+        Запланировать выполнение корутины.
+
+        Если лимит одновременных обработчиков исчерпан,
+        ожидает освобождения места.
+        :param coro: корутина обработки события
+        :return: созданная задача
+        """
+        await self.semaphore.acquire()
+        try:
+            task = asyncio.ensure_future(coro)
+        except BaseException:
+            self.semaphore.release()
+            raise
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        self.semaphore.release()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Дождаться завершения всех выполняющихся обработчиков
+        :param timeout: максимальное время ожидания в секундах,
+        по истечении которого оставшиеся задачи отменяются
+        :return: True, если все задачи завершились сами
+        """
+        if not self.tasks:
+            return True
+
+        done, pending = await asyncio.wait(
+            set(self.tasks), timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return not pending
+
+
+class ChatDispatcher(Dispatcher):
+    """
+    Планировщик с упорядоченной обработкой внутри чата.
+
+    События одного ключа (chatId) обрабатываются строго по очереди
+    отдельным воркером, разные ключи обрабатываются параллельно.
+    Очередь воркера ограничена queue_size, простаивающий дольше
+    idle_timeout воркер завершается и удаляется.
+    """
+
+    __slots__ = (
+        "queue_size",
+        "idle_timeout",
+        "queues",
+        "workers",
+        "running"
+    )
+
+    def __init__(
+            self,
+            limit: int = 100,
+            queue_size: int = 100,
+            idle_timeout: float = 60.0
+    ):
+        super().__init__(limit=limit)
+        self.queue_size: int = queue_size
+        self.idle_timeout: float = idle_timeout
+        self.queues: Dict[Hashable, asyncio.Queue] = {}
+        self.workers: Dict[Hashable, asyncio.Task] = {}
+        self.running: int = 0
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Количество выполняющихся обработчиков: задачи без ключа
+        и воркеры чатов, занятые событием
+        """
+        return len(self.tasks) + self.running
+
+    @property
+    def pending(self) -> int:
+        """
+        Количество событий, ожидающих в очередях чатов
+        """
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    async def schedule(
+            self,
+            coro: Coroutine,
+            key: Optional[Hashable] = None
+    ) -> Optional[asyncio.Task]:
+        """
+        Запланировать выполнение корутины в очереди ключа key.
+
+        Без ключа корутина выполняется параллельно, как в Dispatcher.
+        Если очередь ключа заполнена, ожидает освобождения места.
+        :param coro: корутина обработки события
+        :param key: ключ упорядочивания, например chatId
+        :return: задача для корутины без ключа
+        """
+        if key is None:
+            return await super().schedule(coro)
+
+        queue = self.queues.get(key)
+
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self.queues[key] = queue
+            self.workers[key] = asyncio.ensure_future(
+                self._worker(key, queue))
+
+        await queue.put(coro)
+
+    async def _worker(self, key: Hashable, queue: asyncio.Queue):
+
+        while True:
+            try:
+                coro = await asyncio.wait_for(
+                    queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    self.queues.pop(key, None)
+                    self.workers.pop(key, None)
+                    return
+                continue
+
+            try:
+                async with self.semaphore:
+                    self.running += 1
+                    try:
+                        await coro
+                    finally:
+                        self.running -= 1
+            except Exception as error:
+                asyncio.get_event_loop().call_exception_handler({
+                    'message': f'Unhandled error in chat worker {key}',
+                    'exception': error
+                })
+            finally:
+                queue.task_done()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Дождаться обработки всех очередей и выполняющихся обработчиков
+        :param timeout: максимальное время ожидания в секундах,
+        по истечении которого необработанные события отбрасываются
+        :return: True, если все события были обработаны
+        """
+        waiters = [queue.join() for queue in self.queues.values()]
+
+        finished = True
+
+        if waiters:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*waiters), timeout=timeout)
+            except asyncio.TimeoutError:
+                finished = False
+
+        for key, worker in list(self.workers.items()):
+            worker.cancel()
+            queue = self.queues[key]
+            while not queue.empty():
+                queue.get_nowait().close()
+                queue.task_done()
+
+        if self.workers:
+            await asyncio.gather(
+                *self.workers.values(), return_exceptions=True)
+
+        self.queues.clear()
+        self.workers.clear()
+
+        return await super().drain(timeout=timeout) and finished
+
+
+class Backpressure(object):
+    """
+    Ограничение количества принятых, но еще не обработанных событий.
+
+    Когда событий в обработке становится high_watermark, поллинг
+    приостанавливается и возобновляется, когда их остается
+    low_watermark. Так всплеск нагрузки не превращается
+    в неограниченный рост очередей в памяти. Уже запрошенные пачки
+    событий принимаются целиком, поэтому depth может превысить
+    high_watermark на размер пачки events/get.
+    """
+
+    __slots__ = (
+        "high_watermark",
+        "low_watermark",
+        "depth",
+        "paused",
+        "_resumed"
+    )
+
+    def __init__(
+            self,
+            high_watermark: Optional[int] = 1000,
+            low_watermark: Optional[int] = None
+    ):
+        """
+        :param high_watermark: при таком количестве событий в обработке
+        поллинг приостанавливается, None - без ограничения
+        :param low_watermark: при таком количестве событий в обработке
+        поллинг возобновляется, по умолчанию половина high_watermark
+        """
+        if high_watermark is not None and high_watermark < 1:
+            raise ValueError(
+                f'High watermark must be positive: {high_watermark}')
+        if low_watermark is None:
+            low_watermark = (high_watermark or 0) // 2
+        if high_watermark is not None and low_watermark >= high_watermark:
+            raise ValueError(
+                f'Low watermark must be less than high watermark: '
+                f'{low_watermark} >= {high_watermark}'
+            )
+        self.high_watermark: Optional[int] = high_watermark
+        self.low_watermark: int = low_watermark
+        self.depth: int = 0
+        self.paused: bool = False
+        self._resumed: Optional[asyncio.Event] = None
+
+    def add(self, count: int = 1):
+        """
+        Событие принято в обработку
+        """
+        self.depth += count
+        if self.high_watermark is not None \
+                and self.depth >= self.high_watermark:
+            self.paused = True
+
+    def done(self, count: int = 1):
+        """
+        Обработка события завершена
+        """
+        self.depth = max(self.depth - count, 0)
+        if self.paused and self.depth <= self.low_watermark:
+            self.paused = False
+            if self._resumed is not None:
+                self._resumed.set()
+
+    def reset(self):
+        self.depth = 0
+        self.done(0)
+
+    async def wait(self):
+        """
+        Дождаться возобновления приема событий
+        """
+        while self.paused:
+            if self._resumed is None:
+                self._resumed = asyncio.Event()
+            self._resumed.clear()
+            await self._resumed.wait()
@@ -2,7 +2,7 @@ from enum import Enum, unique
 
 from aiohttp import ClientResponse
 
-from typing import Dict, List, Optional, Union
+from typing import AsyncIterable, BinaryIO, Dict, List, Optional, Union
 
 # from .bot import AsyncBot
 from .helpers import InlineKeyboardMarkup, Format
@@ -65,72 +65,147 @@ class UserInfo(object):
             self=self)
 
 
+_UNSET = object()
+
+MESSAGE_EVENTS = frozenset({
+    EventType.NEW_MESSAGE,
+    EventType.EDITED_MESSAGE,
+    EventType.PINNED_MESSAGE
+})
+
+MEMBERS_EVENTS = frozenset({
+    EventType.NEW_CHAT_MEMBERS,
+    EventType.LEFT_CHAT_MEMBERS
+})
+
+
 class Event(object):
+    """
+    Входящее событие.
 
-    bot = None
+    Payload события хранится как есть, типизированные поля
+    (chat, from_, cb_message, newMembers, ...) создаются
+    при первом обращении и кэшируются. Поля, которых нет
+    у данного типа события, равны None.
+    Событие привязано к боту, который его получил (event.bot).
+    """
 
     __slots__ = (
+        "bot",
         "type",
-        "data",
-        "chat",
-        "from_",
-        "text",
-        "_format",
-        "timestamp",
-        "msgId",
-        "newMembers",
-        "addedBy",
-        "queryId",
-        "cb_message",
-        "callbackData"
+        "eventId",
+        "_data",
+        "_proxy",
+        "_chat",
+        "_from",
+        "_newMembers",
+        "_addedBy",
+        "_cb_message"
     )
 
-    def __init__(self, type_, data):
+    def __init__(self, type_, data, bot=None, eventId=None):
 
+        self.bot = bot
         self.type = type_
-        self.data = MappingProxyType(data)
-        self.text: str = data.get('text')
-
-        if type_ != EventType.CALLBACK_QUERY:
-            self.chat: ChatInfo = ChatInfo(**data['chat'])
-
-        if type_ in [
-            EventType.NEW_MESSAGE,
-            EventType.EDITED_MESSAGE,
-            EventType.PINNED_MESSAGE
-        ]:
-            self.from_: UserInfo = UserInfo(**data['from'])
-            self._format: Dict[str, List[Dict[str, int]]] = data.get('format')
-            self.timestamp: int = data.get('timestamp')
-            self.msgId: str = data.get('msgId')
-        elif type_ in [
-            EventType.DELETED_MESSAGE,
-            EventType.UNPINNED_MESSAGE
-        ]:
-            self.timestamp: int = data.get('timestamp')
-            self.msgId: str = data.get('msgId')
-        elif type_ in [
-            EventType.NEW_CHAT_MEMBERS,
-            EventType.LEFT_CHAT_MEMBERS
-        ]:
-            self.newMembers = [
-                UserInfo(**user) for user in data.get('newMembers', [])
-            ]
-            if data.get('addedBy'):
-                self.addedBy = UserInfo(**data['addedBy'])
-        else:
-            self.queryId = data['queryId']
-            self.from_ = UserInfo(**data['from'])
-            self.cb_message = Event(
+        self.eventId = eventId
+        self._data = data
+        self._proxy = None
+        self._chat = _UNSET
+        self._from = _UNSET
+        self._newMembers = _UNSET
+        self._addedBy = _UNSET
+        self._cb_message = _UNSET
+
+    @property
+    def data(self) -> MappingProxyType:
+        if self._proxy is None:
+            self._proxy = MappingProxyType(self._data)
+        return self._proxy
+
+    @property
+    def text(self) -> Optional[str]:
+        return self._data.get('text')
+
+    @property
+    def chat(self) -> Optional[ChatInfo]:
+        if self._chat is _UNSET:
+            chat = self._data.get('chat') \
+                if self.type != EventType.CALLBACK_QUERY else None
+            self._chat = ChatInfo(**chat) if chat is not None else None
+        return self._chat
+
+    @property
+    def from_(self) -> Optional[UserInfo]:
+        if self._from is _UNSET:
+            user = self._data.get('from') \
+                if self.type in MESSAGE_EVENTS \
+                or self.type == EventType.CALLBACK_QUERY else None
+            self._from = UserInfo(**user) if user is not None else None
+        return self._from
+
+    @property
+    def _format(self) -> Optional[Dict[str, List[Dict[str, int]]]]:
+        return self._data.get('format')
+
+    @property
+    def timestamp(self) -> Optional[int]:
+        return self._data.get('timestamp')
+
+    @property
+    def msgId(self) -> Optional[str]:
+        return self._data.get('msgId')
+
+    @property
+    def parts(self) -> List[Dict]:
+        return self._data.get('parts', [])
+
+    @property
+    def newMembers(self) -> Optional[List[UserInfo]]:
+        if self._newMembers is _UNSET:
+            self._newMembers = [
+                UserInfo(**user) for user in self._data.get('newMembers', [])
+            ] if self.type in MEMBERS_EVENTS else None
+        return self._newMembers
+
+    @property
+    def addedBy(self) -> Optional[UserInfo]:
+        if self._addedBy is _UNSET:
+            user = self._data.get('addedBy') \
+                if self.type in MEMBERS_EVENTS else None
+            self._addedBy = UserInfo(**user) if user else None
+        return self._addedBy
+
+    @property
+    def queryId(self) -> Optional[str]:
+        return self._data.get('queryId')
+
+    @property
+    def callbackData(self) -> Optional[str]:
+        return self._data.get('callbackData')
+
+    @property
+    def cb_message(self) -> Optional['Event']:
+        if self._cb_message is _UNSET:
+            message = self._data.get('message') \
+                if self.type == EventType.CALLBACK_QUERY else None
+            self._cb_message = Event(
                 EventType.NEW_MESSAGE,
-                data['message']
-            )
-            self.callbackData = data['callbackData']
+                message,
+                bot=self.bot
+            ) if message is not None else None
+        return self._cb_message
 
     def __repr__(self):
         return "Event(type='{self.type}', data='{self.data}')".format(
             self=self)
 
+    def __getstate__(self):
+        # Бот с сессией и логгером не передается в другой процесс
+        return self.type, self._data, None, self.eventId
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
     async def answer(
             self,
             text: str,
@@ -259,7 +334,7 @@ class Event(object):
 
     async def answer_by_file(
             self,
-            file_path: str,
+            file_path: Union[str, bytes, BinaryIO, AsyncIterable[bytes]],
             caption: Optional[str] = None,
             replyMsgId: Optional[List[int]] = None,
             forwardChatId: Optional[str] = None,
@@ -267,11 +342,13 @@ class Event(object):
             inlineKeyboardMarkup: Union[
                 List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
             _format: Union[Format, List[Dict], str, None] = None,
-            parseMode: Optional[str] = None
+            parseMode: Optional[str] = None,
+            filename: Optional[str] = None
     ):
         """
         Отправить в ответ на событие файл по его ID
-        :param file_path: Путь к файлу
+        :param file_path: Путь к файлу, bytes, файловый объект
+        или асинхронный итератор по частям файла
         :param caption: Подпись к файлу.
         :param replyMsgId: Id цитируемого сообщения.
         Не может быть передано одновременно
@@ -287,6 +364,7 @@ class Event(object):
         ниже уровнем массив кнопок в конкретной строке
         :param _format: Описание форматирования текста.
         :param parseMode: Режим обработки форматирования из текста сообщения.
+        :param filename: имя файла, по умолчанию берется из пути
         :return: Результат отправки сообщения. Пример:
 
         {
@@ -303,7 +381,8 @@ class Event(object):
             forwardMsgId=forwardMsgId,
             inlineKeyboardMarkup=inlineKeyboardMarkup,
             _format=_format,
-            parseMode=parseMode
+            parseMode=parseMode,
+            filename=filename
         )
 
     async def answer_by_voiceId(
@@ -354,7 +433,7 @@ class Event(object):
 
     async def answer_by_voice(
             self,
-            file_path: str,
+            file_path: Union[str, bytes, BinaryIO, AsyncIterable[bytes]],
             caption: Optional[str] = None,
             replyMsgId: Optional[List[int]] = None,
             forwardChatId: Optional[str] = None,
@@ -362,11 +441,13 @@ class Event(object):
             inlineKeyboardMarkup: Union[
                 List[List[Dict[str, str]]], InlineKeyboardMarkup, None] = None,
             _format: Union[Format, List[Dict], str, None] = None,
-            parseMode: Optional[str] = None
+            parseMode: Optional[str] = None,
+            filename: Optional[str] = None
     ):
         """
         Метод отправки предзагруженного голосового сообщения по его id
-        :param file_path: Путь к файлу
+        :param file_path: Путь к файлу, bytes, файловый объект
+        или асинхронный итератор по частям файла
         :param replyMsgId: Id цитируемого сообщения.
         Не может быть передано одновременно
         с параметрами forwardChatId и forwardMsgId.
@@ -379,6 +460,7 @@ class Event(object):
         :param inlineKeyboardMarkup: Это массив массивов с описанием кнопок.
         Верхний уровень это массив строк кнопок,
         ниже уровнем массив кнопок в конкретной строке
+        :param filename: имя файла, по умолчанию берется из пути
         :return: Сервер вернул id сообщения. Пример:
 
         {
@@ -395,7 +477,8 @@ class Event(object):
             forwardMsgId=forwardMsgId,
             inlineKeyboardMarkup=inlineKeyboardMarkup,
             _format=_format,
-            parseMode=parseMode
+            parseMode=parseMode,
+            filename=filename
         )
 
     async def delete_msg(self) -> ClientResponse:
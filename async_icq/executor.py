@@ -0,0 +1,118 @@
+import os
+import asyncio
+import functools
+
+from concurrent.futures import Executor, ThreadPoolExecutor, \
+    ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from .constant import HandlerExecutor
+
+
+def process_handler(handler: Callable) -> Callable:
+    """
+    Декоратор синхронного обработчика, который должен выполняться
+    в пуле процессов, а не в пуле потоков.
+
+    Обработчик и событие передаются в процесс через pickle, поэтому
+    обработчик должен быть функцией уровня модуля, а событие приходит
+    без бота (event.bot is None). Подходит для CPU-тяжелой работы
+    без ответа в чат.
+    """
+    handler.executor = HandlerExecutor.PROCESS
+    return handler
+
+
+def is_coroutine_handler(handler: Callable) -> bool:
+    """
+    Обработчик возвращает корутину: async def, в том числе обернутая
+    декоратором с functools.wraps или functools.partial, и объект
+    с async def __call__
+    """
+    for _ in range(100):
+        if asyncio.iscoroutinefunction(handler) or \
+                asyncio.iscoroutinefunction(
+                    getattr(handler, '__call__', None)):
+            return True
+        if isinstance(handler, functools.partial):
+            handler = handler.func
+        elif getattr(handler, '__wrapped__', None) is not None:
+            handler = handler.__wrapped__
+        else:
+            return False
+    return False
+
+
+def handler_executor(handler: Callable) -> HandlerExecutor:
+    return getattr(handler, 'executor', HandlerExecutor.THREAD)
+
+
+class HandlerExecutors(object):
+    """
+    Пулы для выполнения синхронных обработчиков вне event loop.
+
+    По умолчанию обработчик выполняется в ограниченном пуле потоков,
+    обработчики с @process_handler - в пуле процессов.
+    Пулы создаются при первом использовании.
+    """
+
+    __slots__ = (
+        "threads",
+        "processes",
+        "loop",
+        "_thread_pool",
+        "_process_pool"
+    )
+
+    def __init__(self, threads: int = 10, processes: Optional[int] = None):
+        """
+        :param threads: размер пула потоков
+        :param processes: размер пула процессов, по умолчанию
+        количество ядер
+        """
+        if threads < 1:
+            raise ValueError(f'Thread pool size must be positive: {threads}')
+        self.threads: int = threads
+        self.processes: int = processes or os.cpu_count() or 1
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def executor(self, kind: HandlerExecutor) -> Executor:
+        if kind == HandlerExecutor.PROCESS:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.processes)
+            return self._process_pool
+
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.threads,
+                thread_name_prefix='async-icq-handler'
+            )
+        return self._thread_pool
+
+    def run(self, handler: Callable, *args) -> Awaitable[Any]:
+        """
+        Выполнить синхронную функцию в пуле, подходящем обработчику
+        :param handler: синхронная функция
+        :param args: аргументы функции
+        :return: future с результатом функции
+        """
+        self.loop = asyncio.get_event_loop()
+        return self.loop.run_in_executor(
+            self.executor(handler_executor(handler)),
+            functools.partial(handler, *args)
+        )
+
+    def shutdown(self, wait: bool = True):
+        """
+        Остановить пулы, следующий вызов run создаст их заново
+        :param wait: дождаться завершения выполняющихся функций
+        """
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+            self._process_pool = None
@@ -0,0 +1,154 @@
+import os
+import json
+import asyncio
+import hashlib
+
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Union
+
+
+# Ответы на отправку по fileId, после которых fileId считается
+# недействительным. 429 и 5xx - временные ошибки, fileId остается в кэше
+INVALID_FILE_STATUSES: FrozenSet[int] = frozenset({400, 404, 410})
+
+
+def file_hash(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    sha256 содержимого файла, файл читается частями
+    :param filepath: путь к файлу
+    :param chunk_size: размер читаемой части в байтах
+    :return: hex-строка хэша
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_hash(data: Union[bytes, bytearray, memoryview]) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+async def async_file_hash(filepath: str) -> str:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, file_hash, filepath)
+
+
+class FileIdCache(object):
+    """
+    LRU-кэш fileId загруженных файлов по хэшу их содержимого.
+
+    Позволяет загрузить файл на сервер один раз, а дальше отправлять его
+    по fileId. Одновременные отправки одного файла ждут одну загрузку
+    (uploads). При указании path кэш сохраняется на диск в JSON
+    в пуле потоков, не блокируя event loop.
+    """
+
+    __slots__ = (
+        "maxsize",
+        "path",
+        "hits",
+        "misses",
+        "uploads",
+        "_items",
+        "_dirty",
+        "_saving"
+    )
+
+    def __init__(self, maxsize: int = 1024, path: Optional[str] = None):
+        """
+        :param maxsize: максимальное количество файлов в кэше
+        :param path: путь к файлу для хранения кэша на диске
+        """
+        self.maxsize: int = maxsize
+        self.path: Optional[str] = path
+        self.hits: int = 0
+        self.misses: int = 0
+        self.uploads: Dict[str, asyncio.Future] = {}
+        self._items: 'OrderedDict[str, str]' = OrderedDict()
+        self._dirty: bool = False
+        self._saving: Optional[asyncio.Future] = None
+
+        if path is not None and os.path.isfile(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def key(kind: str, digest: str) -> str:
+        """
+        Ключ кэша: один и тот же файл, загруженный как файл
+        и как голосовое сообщение, получает разные fileId
+        """
+        return f'{kind}:{digest}'
+
+    def get(self, key: str) -> Optional[str]:
+        fileId = self._items.get(key)
+        if fileId is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return fileId
+
+    def set(self, key: str, fileId: str):
+        self._items[key] = fileId
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        self.schedule_save()
+
+    def discard(self, key: str, fileId: Optional[str] = None):
+        """
+        Удалить fileId из кэша
+        :param key: ключ файла
+        :param fileId: удалить, только если в кэше все еще этот fileId
+        """
+        if fileId is not None and self._items.get(key) != fileId:
+            return
+        if self._items.pop(key, None) is not None:
+            self.schedule_save()
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            items = json.load(f)
+        self._items = OrderedDict(list(items.items())[-self.maxsize:])
+
+    def save(self, items: Optional[Dict[str, str]] = None):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._items if items is None else items, f)
+        os.replace(tmp_path, self.path)
+
+    def schedule_save(self):
+        """
+        Сохранить кэш на диск в пуле потоков.
+        Изменения, сделанные во время сохранения, сохраняются следующим
+        """
+        if self.path is None:
+            return
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+
+        self._dirty = True
+        if self._saving is None or self._saving.done():
+            self._saving = asyncio.ensure_future(self._save())
+
+    async def _save(self):
+        loop = asyncio.get_event_loop()
+        while self._dirty:
+            self._dirty = False
+            await loop.run_in_executor(None, self.save, dict(self._items))
+
+    async def flush(self):
+        """
+        Дождаться сохранения кэша на диск
+        """
+        if self._saving is not None:
+            await self._saving
@@ -1,7 +1,9 @@
-try:
-    import ujson as json
-except ImportError:
-    import json
+import warnings
+
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Union
+
+from . import codec
 
 from .constant import StyleType
 
@@ -25,13 +27,54 @@ class JsonDeserializable(object):
         raise NotImplementedError
 
 
+def _deprecated_attribute(owner: object, name: str, method: str):
+    warnings.warn(
+        f'Direct access to {type(owner).__name__}.{name} is deprecated '
+        f'and drops the cached JSON, use {method} instead',
+        DeprecationWarning,
+        stacklevel=3
+    )
+
+
+class Frozen(object):
+    """
+    Неизменяемый объект, JSON которого сериализуется один раз при создании.
+    Такие объекты можно объявить константами модуля и передавать
+    в каждое сообщение без повторной сериализации
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __hash__(self):
+        return hash(self.to_json())
+
+    def __eq__(self, other):
+        # Только с неизменяемыми объектами того же типа: изменяемые
+        # объекты хэшируются по id, и равенство с ними нарушило бы
+        # согласованность __eq__ и __hash__
+        if isinstance(other, Frozen):
+            return type(self) is type(other) \
+                and self.to_json() == other.to_json()
+        return NotImplemented
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_json()})'
+
+
 class KeyboardButton(Dictionaryable, JsonSerializable):
 
     __slots__ = (
         "text",
         "callbackData",
         "style",
-        "url"
+        "url",
+        "_json"
     )
 
     def __init__(self, text: str, style: str = 'primary',
@@ -41,8 +84,23 @@ class KeyboardButton(Dictionaryable, JsonSerializable):
         self.style = style
         self.url = url
 
+    def __setattr__(self, name, value):
+        # Изменение кнопки сбрасывает сериализованный JSON
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_json', None)
+
+    def freeze(self) -> 'FrozenKeyboardButton':
+        return FrozenKeyboardButton(
+            text=self.text,
+            style=self.style,
+            callbackData=self.callbackData,
+            url=self.url
+        )
+
     def to_json(self):
-        return json.dumps(self.to_dic())
+        if self._json is None:
+            object.__setattr__(self, '_json', codec.dumps(self.to_dic()))
+        return self._json
 
     def to_dic(self):
         json_dic = {'text': self.text}
@@ -55,88 +113,314 @@ class KeyboardButton(Dictionaryable, JsonSerializable):
         return json_dic
 
 
+class FrozenKeyboardButton(Frozen, KeyboardButton):
+    """
+    Неизменяемая кнопка
+    """
+
+    __slots__ = ()
+
+    def __init__(self, text: str, style: str = 'primary',
+                 callbackData: str = None, url: str = None):
+        for name, value in (
+                ('text', text),
+                ('callbackData', callbackData),
+                ('style', style),
+                ('url', url)
+        ):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_json', codec.dumps(self.to_dic()))
+
+    def __reduce__(self):
+        return type(self), (self.text, self.style, self.callbackData, self.url)
+
+    def freeze(self) -> 'FrozenKeyboardButton':
+        return self
+
+
 class InlineKeyboardMarkup(Dictionaryable, JsonSerializable):
+    """
+    Клавиатура сообщения. JSON клавиатуры кэшируется до изменения
+    через add() или row(), freeze() возвращает неизменяемую копию.
+    Прямой доступ к keyboard устарел: он сбрасывает кэш, так как
+    список может быть изменен в обход add() и row()
+    """
 
     __slots__ = (
         "buttons_in_row",
-        "keyboard"
+        "_keyboard",
+        "_json"
     )
 
     def __init__(self, buttons_in_row=8):
         self.buttons_in_row = buttons_in_row
-        self.keyboard = []
+        self._keyboard = []
+        self._json = None
+
+    @property
+    def keyboard(self) -> List[List[Dict]]:
+        _deprecated_attribute(self, 'keyboard', 'add() or row()')
+        self._json = None
+        return self._keyboard
+
+    @keyboard.setter
+    def keyboard(self, keyboard: List[List[Dict]]):
+        _deprecated_attribute(self, 'keyboard', 'add() or row()')
+        self._keyboard = keyboard
+        self._json = None
 
     def add(self, *args):
+        self._json = None
         i = 1
         row = []
         for button in args:
             row.append(button.to_dic())
             if i % self.buttons_in_row == 0:
-                self.keyboard.append(row)
+                self._keyboard.append(row)
                 row = []
             i += 1
-        self.keyboard.append(row) if len(row) > 0 else None
+        self._keyboard.append(row) if len(row) > 0 else None
 
     def row(self, *args):
+        self._json = None
         btn_array = []
         for button in args:
             btn_array.append(button.to_dic())
-        self.keyboard.append(btn_array)
+        self._keyboard.append(btn_array)
         return self
 
+    def freeze(self) -> 'FrozenInlineKeyboardMarkup':
+        return FrozenInlineKeyboardMarkup(
+            self._keyboard, buttons_in_row=self.buttons_in_row)
+
     def to_json(self):
-        return json.dumps(self.keyboard)
+        if self._json is None:
+            self._json = codec.dumps(self._keyboard)
+        return self._json
 
     def to_dic(self):
-        return self.keyboard
+        # Копия: изменение результата не должно расходиться с JSON
+        return [[dict(button) for button in row] for row in self._keyboard]
+
+
+class FrozenInlineKeyboardMarkup(Frozen, InlineKeyboardMarkup):
+    """
+    Неизменяемая клавиатура:
+
+    MENU = FrozenInlineKeyboardMarkup([
+        [KeyboardButton(text='Yes', callbackData='yes')],
+        [KeyboardButton(text='No', callbackData='no')]
+    ])
+    """
+
+    __slots__ = ()
+
+    def __init__(
+            self,
+            keyboard: Iterable[Iterable[Union[KeyboardButton, Dict]]] = (),
+            buttons_in_row: int = 8
+    ):
+        """
+        :param keyboard: ряды кнопок: KeyboardButton или словари Bot API
+        :param buttons_in_row: сохраняется для совместимости
+        с InlineKeyboardMarkup
+        """
+        rows = tuple(
+            tuple(
+                button.to_dic() if isinstance(button, KeyboardButton)
+                else dict(button)
+                for button in row
+            )
+            for row in keyboard
+        )
+        object.__setattr__(self, 'buttons_in_row', buttons_in_row)
+        object.__setattr__(self, '_keyboard', rows)
+        object.__setattr__(self, '_json', codec.dumps(rows))
+
+    def __reduce__(self):
+        return type(self), (self._keyboard, self.buttons_in_row)
+
+    @property
+    def keyboard(self) -> tuple:
+        return self._keyboard
+
+    def add(self, *args):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def row(self, *args):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def freeze(self) -> 'FrozenInlineKeyboardMarkup':
+        return self
 
 
 class Style(Dictionaryable, JsonSerializable):
+    """
+    Диапазоны одного стиля, добавляются через add().
+    Прямой доступ к ranges устарел и сбрасывает кэш JSON
+    """
 
     __slots__ = (
-        "ranges"
+        "_ranges",
+        "_json"
     )
 
     def __init__(self):
-        self.ranges = []
+        self._ranges = []
+        self._json = None
+
+    @property
+    def ranges(self) -> List[Dict]:
+        _deprecated_attribute(self, 'ranges', 'add()')
+        self._json = None
+        return self._ranges
+
+    @ranges.setter
+    def ranges(self, ranges: List[Dict]):
+        _deprecated_attribute(self, 'ranges', 'add()')
+        self._ranges = ranges
+        self._json = None
 
     def add(self, offset, length, args=None):
+        self._json = None
         range_ = {"offset": offset, "length": length}
         if args is not None:
-            self.ranges.append({**range_, **args})
+            self._ranges.append({**range_, **args})
         else:
-            self.ranges.append(range_)
+            self._ranges.append(range_)
+
+    def freeze(self) -> 'FrozenStyle':
+        return FrozenStyle(self._ranges)
 
     def to_dic(self):
-        return self.ranges
+        return [dict(range_) for range_ in self._ranges]
 
     def to_json(self):
-        return json.dumps(self.ranges)
+        if self._json is None:
+            self._json = codec.dumps(self._ranges)
+        return self._json
+
+
+class FrozenStyle(Frozen, Style):
+    """
+    Неизменяемый список диапазонов одного стиля
+    """
+
+    __slots__ = ()
+
+    def __init__(self, ranges: Iterable[Dict] = ()):
+        """
+        :param ranges: диапазоны {"offset": ..., "length": ..., ...}
+        """
+        ranges = tuple(dict(range_) for range_ in ranges)
+        object.__setattr__(self, '_ranges', ranges)
+        object.__setattr__(self, '_json', codec.dumps(ranges))
+
+    def __reduce__(self):
+        return type(self), (self._ranges,)
+
+    @property
+    def ranges(self) -> tuple:
+        return self._ranges
+
+    def add(self, offset, length, args=None):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def freeze(self) -> 'FrozenStyle':
+        return self
 
 
 class Format(Dictionaryable, JsonSerializable):
+    """
+    Форматирование текста сообщения. JSON собирается из кэшированного
+    JSON стилей, поэтому изменение любого стиля сразу в нем отражается.
+    freeze() возвращает неизменяемую копию.
+    Прямой доступ к styles устарел, стили добавляются через add()
+    """
 
     __slots__ = (
-        "styles"
+        "_styles",
+        "_json"
     )
 
     def __init__(self):
-        self.styles = {}
+        self._styles = {}
+        self._json = None
+
+    @property
+    def styles(self) -> Dict[str, Style]:
+        _deprecated_attribute(self, 'styles', 'add()')
+        return self._styles
+
+    @styles.setter
+    def styles(self, styles: Dict[str, Style]):
+        _deprecated_attribute(self, 'styles', 'add()')
+        self._styles = styles
 
     def add(self, style, offset, length, args=None):
         StyleType(style)
-        if style in self.styles.keys():
-            self.styles[style].add(offset, length, args)
+        if style in self._styles.keys():
+            self._styles[style].add(offset, length, args)
         else:
             newStyle = Style()
             newStyle.add(offset, length, args)
-            self.styles[style] = newStyle
+            self._styles[style] = newStyle
+
+    def freeze(self) -> 'FrozenFormat':
+        return FrozenFormat(self._styles)
 
     def to_dic(self):
-        return self.styles
+        return dict(self._styles)
+
+    def to_json(self):
+        return '{' + ','.join(
+            f'{codec.dumps(key)}:{style.to_json()}'
+            for key, style in self._styles.items()
+        ) + '}'
+
+
+class FrozenFormat(Frozen, Format):
+    """
+    Неизменяемое форматирование:
+
+    BOLD_TITLE = FrozenFormat({'bold': [{'offset': 0, 'length': 5}]})
+    """
+
+    __slots__ = ()
+
+    def __init__(
+            self,
+            styles: Mapping[str, Union[Style, Iterable[Dict]]] = ()
+    ):
+        """
+        :param styles: диапазоны по типам стилей (StyleType):
+        Style или список словарей Bot API
+        """
+        frozen = {}
+        for style, ranges in dict(styles).items():
+            StyleType(style)
+            frozen[style] = ranges.freeze() if isinstance(ranges, Style) \
+                else FrozenStyle(ranges)
+        # Представление стилей и JSON создаются один раз
+        object.__setattr__(self, '_styles', MappingProxyType(frozen))
+        object.__setattr__(self, '_json', codec.dumps({
+            key: style._ranges for key, style in frozen.items()
+        }))
+
+    def __reduce__(self):
+        return type(self), ({
+            key: style._ranges for key, style in self._styles.items()
+        },)
+
+    @property
+    def styles(self) -> Mapping[str, FrozenStyle]:
+        return self._styles
+
+    def add(self, style, offset, length, args=None):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def freeze(self) -> 'FrozenFormat':
+        return self
 
     def to_json(self):
-        result = {}
-        for key in self.styles.keys():
-            result[key] = self.styles[key].to_dic()
-        return json.dumps(result)
+        return self._json
@@ -0,0 +1,76 @@
+from typing import Any, Iterable
+
+from aiologger.formatters.base import Formatter
+from aiologger.records import LogRecord
+
+
+REDACTED = '***'
+
+
+class RedactingFormatter(Formatter):
+    """
+    Formatter, скрывающий секреты (токен бота) в готовой строке лога,
+    включая тексты ошибок и traceback-и с URL запросов
+    """
+
+    def __init__(self, fmt: str = None, secrets: Iterable[str] = ()):
+        super().__init__(fmt)
+        self.secrets = tuple(secret for secret in secrets if secret)
+
+    def format(self, record: LogRecord) -> str:
+        text = super().format(record)
+        for secret in self.secrets:
+            if secret in text:
+                text = text.replace(secret, REDACTED)
+        return text
+
+
+class LogSampler(object):
+    """
+    Детерминированная выборка: пропускает каждую N-ю запись,
+    где N = 1 / rate
+    """
+
+    __slots__ = (
+        "rate",
+        "every",
+        "count"
+    )
+
+    def __init__(self, rate: float = 1.0):
+        """
+        :param rate: доля записей, которые попадают в лог, от 0 до 1
+        """
+        if not 0 <= rate <= 1:
+            raise ValueError(f'Log sample rate must be in [0, 1]: {rate}')
+        self.rate: float = rate
+        self.every: int = round(1 / rate) if rate else 0
+        self.count: int = 0
+
+    def sample(self) -> bool:
+        if self.every <= 1:
+            return self.every == 1
+        self.count += 1
+        return self.count % self.every == 0
+
+
+def log_fields(event: str, max_length: int = 200, **fields: Any) -> str:
+    """
+    Структурированная строка лога: event key=value ...
+    Длинные значения обрезаются до max_length символов.
+    Вызывается только после проверки уровня лога
+    :param event: название записи
+    :param max_length: максимальная длина значения
+    :param fields: поля записи, None пропускаются
+    :return: строка лога
+    """
+    parts = [event]
+    for key, value in fields.items():
+        if value is None:
+            continue
+        if not isinstance(value, str) or ' ' in value:
+            value = repr(value)
+        if len(value) > max_length:
+            value = f'{value[:max_length]}...'
+        parts.append(f'{key}={value}')
+    return ' '.join(parts)
@@ -0,0 +1,396 @@
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, \
+    Union
+
+from . import codec
+from .helpers import InlineKeyboardMarkup, Format
+
+
+Query = List[Tuple[str, Any]]
+
+
+def keyboard_to_json(
+        keyboard_markup: Union[
+            List[List[Dict]], InlineKeyboardMarkup, str, None
+        ]
+) -> Union[str, None]:
+    if keyboard_markup is None or isinstance(keyboard_markup, str):
+        return keyboard_markup
+    elif isinstance(keyboard_markup, InlineKeyboardMarkup):
+        return keyboard_markup.to_json()
+    elif isinstance(keyboard_markup, list):
+        return codec.dumps(keyboard_markup)
+    else:
+        raise ValueError(
+            f'Unsupported type: keyboard_markup ({type(keyboard_markup)})')
+
+
+def format_to_json(format_: Union[Format, List[Dict], str, None]):
+    if format_ is None or isinstance(format_, str):
+        return format_
+    elif isinstance(format_, Format):
+        return format_.to_json()
+    elif isinstance(format_, list):
+        return codec.dumps(format_)
+    else:
+        raise ValueError(
+            f'Unsupported type: format_ ({type(format_)})')
+
+
+def bool_to_str(value: Union[bool, str]) -> str:
+    if isinstance(value, str):
+        return value
+    return 'true' if value else 'false'
+
+
+def members_to_json(members: Union[List[str], str]) -> str:
+    if isinstance(members, str):
+        return members
+    return codec.dumps([{"sn": member} for member in members])
+
+
+class Param(object):
+    """
+    Параметр метода Bot API: имя в запросе и способ кодирования значения
+    """
+
+    __slots__ = (
+        "encode",
+        "repeated"
+    )
+
+    def __init__(
+            self,
+            encode: Optional[Callable[[Any], Any]] = None,
+            repeated: bool = False
+    ):
+        """
+        :param encode: преобразование значения в строку запроса,
+        None - значение передается как есть
+        :param repeated: список передается повторением параметра:
+        msgId=1&msgId=2
+        """
+        self.encode: Optional[Callable[[Any], Any]] = encode
+        self.repeated: bool = repeated
+
+
+VALUE = Param()
+LIST = Param(repeated=True)
+BOOL = Param(bool_to_str)
+MEMBERS = Param(members_to_json)
+KEYBOARD = Param(keyboard_to_json)
+FORMAT = Param(format_to_json)
+
+
+class Method(object):
+    """
+    Описание метода Bot API: path, HTTP-метод и параметры.
+
+    Спецификация параметров разбирается один раз при создании,
+    build() только обходит ее и собирает список пар для строки запроса,
+    пропуская параметры со значением None.
+    """
+
+    __slots__ = (
+        "path",
+        "verb",
+        "params",
+        "body",
+        "_plain",
+        "_encoded",
+        "_repeated"
+    )
+
+    def __init__(
+            self,
+            path: str,
+            verb: str = 'GET',
+            body: Tuple[str, ...] = (),
+            **params: Param
+    ):
+        """
+        :param path: path метода относительно /bot/v1/
+        :param verb: HTTP-метод запроса
+        :param body: параметры, которые можно передать в теле POST-запроса
+        (текст, format, клавиатура)
+        :param params: параметры метода в порядке передачи
+        """
+        self.path: str = path
+        self.verb: str = verb
+        self.params: Dict[str, Param] = params
+        self.body: FrozenSet[str] = frozenset(body)
+
+        # Тип параметра проверяется при создании метода, а не при вызове
+        self._plain: Tuple[str, ...] = tuple(
+            name for name, param in params.items()
+            if param.encode is None and not param.repeated
+        )
+        self._encoded: Tuple[Tuple[str, Callable[[Any], Any]], ...] = tuple(
+            (name, param.encode) for name, param in params.items()
+            if param.encode is not None
+        )
+        self._repeated: Tuple[str, ...] = tuple(
+            name for name, param in params.items() if param.repeated
+        )
+
+    def __repr__(self):
+        return "Method({self.verb} {self.path})".format(self=self)
+
+    def build(self, token: str, values: Dict[str, Any]) -> Query:
+        """
+        Параметры строки запроса
+        :param token: токен бота
+        :param values: значения параметров по именам, None пропускаются
+        :return: список пар (имя, значение)
+        """
+        query: Query = [('token', token)]
+
+        for name in self._plain:
+            value = values.get(name)
+            if value is not None:
+                query.append((name, value))
+
+        for name, encode in self._encoded:
+            value = values.get(name)
+            if value is not None:
+                query.append((name, encode(value)))
+
+        for name in self._repeated:
+            value = values.get(name)
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                query.extend((name, item) for item in value)
+            else:
+                query.append((name, value))
+
+        return query
+
+    def body_size(self, query: Query) -> int:
+        """
+        Размер значений параметров, которые можно передать в теле запроса
+        :param query: параметры запроса (build)
+        :return: суммарная длина значений в символах
+        """
+        return sum(
+            len(value) for name, value in query
+            if name in self.body and isinstance(value, str)
+        )
+
+    def split(self, query: Query) -> Tuple[Query, Query]:
+        """
+        Разделить параметры между строкой запроса и телом POST-запроса
+        :param query: параметры запроса (build)
+        :return: (параметры строки запроса, поля формы)
+        """
+        params: Query = []
+        form: Query = []
+        for name, value in query:
+            (form if name in self.body else params).append((name, value))
+        return params, form
+
+
+def build_query(token: str, values: Dict[str, Any]) -> Query:
+    """
+    Параметры строки запроса для метода без описания в таблице:
+    списки передаются повторением параметра, bool - строками true/false
+    :param token: токен бота
+    :param values: значения параметров по именам, None пропускаются
+    :return: список пар (имя, значение)
+    """
+    query: Query = [('token', token)]
+
+    for name, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            query.append((name, bool_to_str(value)))
+        elif isinstance(value, (list, tuple)):
+            query.extend((name, item) for item in value)
+        else:
+            query.append((name, value))
+
+    return query
+
+
+def query_value(query: Query, name: str) -> Any:
+    for key, value in query:
+        if key == name:
+            return value
+    return None
+
+
+# Текст, разметка и клавиатура сообщения могут не поместиться в URL
+MESSAGE_BODY = ('text', 'caption', 'format', 'inlineKeyboardMarkup')
+
+SELF_GET = Method('self/get')
+
+EVENTS_GET = Method(
+    'events/get',
+    lastEventId=VALUE,
+    pollTime=VALUE
+)
+
+SEND_TEXT = Method(
+    'messages/sendText',
+    body=MESSAGE_BODY,
+    chatId=VALUE,
+    text=VALUE,
+    replyMsgId=LIST,
+    forwardChatId=VALUE,
+    forwardMsgId=LIST,
+    inlineKeyboardMarkup=KEYBOARD,
+    format=FORMAT,
+    parseMode=VALUE
+)
+
+SEND_FILE = Method(
+    'messages/sendFile',
+    body=MESSAGE_BODY,
+    chatId=VALUE,
+    fileId=VALUE,
+    caption=VALUE,
+    replyMsgId=LIST,
+    forwardChatId=VALUE,
+    forwardMsgId=LIST,
+    inlineKeyboardMarkup=KEYBOARD,
+    format=FORMAT,
+    parseMode=VALUE
+)
+
+SEND_VOICE = Method(
+    'messages/sendVoice',
+    body=MESSAGE_BODY,
+    chatId=VALUE,
+    fileId=VALUE,
+    caption=VALUE,
+    replyMsgId=LIST,
+    forwardChatId=VALUE,
+    forwardMsgId=LIST,
+    inlineKeyboardMarkup=KEYBOARD,
+    format=FORMAT,
+    parseMode=VALUE
+)
+
+EDIT_TEXT = Method(
+    'messages/editText',
+    body=MESSAGE_BODY,
+    chatId=VALUE,
+    msgId=VALUE,
+    text=VALUE,
+    inlineKeyboardMarkup=KEYBOARD,
+    format=FORMAT,
+    parseMode=VALUE
+)
+
+DELETE_MESSAGES = Method(
+    'messages/deleteMessages',
+    chatId=VALUE,
+    msgId=LIST
+)
+
+ANSWER_CALLBACK_QUERY = Method(
+    'messages/answerCallbackQuery',
+    queryId=VALUE,
+    text=VALUE,
+    showAlert=BOOL,
+    url=VALUE
+)
+
+CREATE_CHAT = Method(
+    'chats/createChat',
+    name=VALUE,
+    about=VALUE,
+    rules=VALUE,
+    members=MEMBERS,
+    public=BOOL,
+    defaultRole=VALUE,
+    joinModeration=BOOL
+)
+
+ADD_MEMBERS = Method(
+    'chats/members/add',
+    chatId=VALUE,
+    members=MEMBERS
+)
+
+DELETE_MEMBERS = Method(
+    'chats/members/delete',
+    chatId=VALUE,
+    members=MEMBERS
+)
+
+SEND_ACTIONS = Method(
+    'chats/sendActions',
+    chatId=VALUE,
+    actions=VALUE
+)
+
+GET_CHAT_INFO = Method('chats/getInfo', chatId=VALUE)
+
+GET_CHAT_ADMINS = Method('chats/getAdmins', chatId=VALUE)
+
+GET_CHAT_MEMBERS = Method('chats/getMembers', chatId=VALUE, cursor=VALUE)
+
+GET_BLOCKED_USERS = Method('chats/getBlockedUsers', chatId=VALUE)
+
+GET_PENDING_USERS = Method('chats/getPendingUsers', chatId=VALUE)
+
+BLOCK_USER = Method(
+    'chats/blockUser',
+    chatId=VALUE,
+    userId=VALUE,
+    delLastMessages=BOOL
+)
+
+UNBLOCK_USER = Method('chats/unblockUser', chatId=VALUE, userId=VALUE)
+
+RESOLVE_PENDING = Method(
+    'chats/resolvePending',
+    chatId=VALUE,
+    approve=BOOL,
+    userId=VALUE,
+    everyone=BOOL
+)
+
+SET_TITLE = Method('chats/setTitle', chatId=VALUE, title=VALUE)
+
+SET_ABOUT = Method('chats/setAbout', chatId=VALUE, about=VALUE)
+
+SET_RULES = Method('chats/setRules', chatId=VALUE, rules=VALUE)
+
+PIN_MESSAGE = Method('chats/pinMessage', chatId=VALUE, msgId=VALUE)
+
+UNPIN_MESSAGE = Method('chats/unpinMessage', chatId=VALUE, msgId=VALUE)
+
+GET_FILE_INFO = Method('files/getInfo', fileId=VALUE)
+
+METHODS: Dict[str, Method] = {
+    method.path: method for method in (
+        SELF_GET,
+        EVENTS_GET,
+        SEND_TEXT,
+        SEND_FILE,
+        SEND_VOICE,
+        EDIT_TEXT,
+        DELETE_MESSAGES,
+        ANSWER_CALLBACK_QUERY,
+        CREATE_CHAT,
+        ADD_MEMBERS,
+        DELETE_MEMBERS,
+        SEND_ACTIONS,
+        GET_CHAT_INFO,
+        GET_CHAT_ADMINS,
+        GET_CHAT_MEMBERS,
+        GET_BLOCKED_USERS,
+        GET_PENDING_USERS,
+        BLOCK_USER,
+        UNBLOCK_USER,
+        RESOLVE_PENDING,
+        SET_TITLE,
+        SET_ABOUT,
+        SET_RULES,
+        PIN_MESSAGE,
+        UNPIN_MESSAGE,
+        GET_FILE_INFO,
+    )
+}
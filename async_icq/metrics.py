@@ -0,0 +1,348 @@
+import socket
+import bisect
+import functools
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics(object):
+    """
+    Приемник метрик бота, по умолчанию ничего не делает.
+
+    Бот вызывает методы приемника только если enabled, поэтому
+    выключенные метрики не стоят ничего, кроме одной проверки.
+    Используемые ботом метрики:
+
+    bot_api_request_seconds{method, path} - длительность запросов к Bot API,
+    bot_api_responses_total{path, status} - ответы и ошибки запросов,
+    bot_poll_gap_seconds - время между ответом events/get и следующим
+    запросом событий,
+    bot_events_total{type} - полученные события,
+    bot_middleware_seconds, bot_middleware_rejected_total - проверки
+    middleware,
+    bot_handler_seconds{handler}, bot_handler_errors_total{handler} -
+    обработчики,
+    bot_pending_events, bot_handlers_in_flight, bot_handlers_pending,
+    bot_rate_limit_queue - глубина очередей.
+    """
+
+    __slots__ = ()
+
+    enabled: bool = False
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        """
+        Увеличить счетчик
+        """
+
+    def set(self, name: str, value: float, **labels: str):
+        """
+        Установить значение датчика
+        """
+
+    def observe(self, name: str, value: float, **labels: str):
+        """
+        Добавить значение в гистограмму
+        """
+
+    async def start(self):
+        """
+        Вызывается при открытии сессии бота
+        """
+
+    async def close(self):
+        """
+        Вызывается при закрытии сессии бота
+        """
+
+
+def handler_label(handler: Callable) -> str:
+    """
+    Метка обработчика: имя функции, для functools.partial - имя
+    исходной функции, для вызываемого объекта - имя класса
+    """
+    if isinstance(handler, functools.partial):
+        handler = handler.func
+    return getattr(handler, '__name__', type(handler).__name__)
+
+
+class Histogram(object):
+
+    __slots__ = (
+        "buckets",
+        "counts",
+        "sum",
+        "count"
+    )
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets: Sequence[float] = buckets
+        self.counts: List[int] = [0] * len(buckets)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Метрики в памяти процесса, snapshot() возвращает их текущие значения
+    """
+
+    __slots__ = (
+        "buckets",
+        "counters",
+        "gauges",
+        "histograms"
+    )
+
+    enabled = True
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        :param buckets: верхние границы корзин гистограмм в секундах
+        """
+        self.buckets: Sequence[float] = buckets
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str):
+        self.gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str):
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Текущие значения метрик
+        :return: {'counters': ..., 'gauges': ..., 'histograms': ...},
+        серии метрики индексируются кортежем пар (метка, значение)
+        """
+        return {
+            'counters': {
+                name: dict(series) for name, series in self.counters.items()
+            },
+            'gauges': {
+                name: dict(series) for name, series in self.gauges.items()
+            },
+            'histograms': {
+                name: {
+                    key: {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'buckets': histogram.cumulative()
+                    }
+                    for key, histogram in series.items()
+                }
+                for name, series in self.histograms.items()
+            }
+        }
+
+
+def _prometheus_labels(labels: Labels, extra: str = '') -> str:
+    items = [
+        '{}="{}"'.format(
+            key, value.replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels
+    ]
+    if extra:
+        items.append(extra)
+    return '{' + ','.join(items) + '}' if items else ''
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """
+    Метрики в памяти процесса с HTTP endpoint-ом в текстовом
+    формате Prometheus
+    """
+
+    __slots__ = (
+        "host",
+        "port",
+        "path",
+        "runner"
+    )
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: Optional[int] = 9100,
+            path: str = '/metrics',
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        """
+        :param host: адрес endpoint-а, по умолчанию доступен только
+        с localhost, '0.0.0.0' - на всех интерфейсах
+        :param port: порт endpoint-а, None - не запускать сервер,
+        текст метрик доступен через render()
+        :param path: путь endpoint-а
+        :param buckets: верхние границы корзин гистограмм в секундах
+        """
+        super().__init__(buckets=buckets)
+        self.host: str = host
+        self.port: Optional[int] = port
+        self.path: str = path
+        self.runner: Optional[web.AppRunner] = None
+
+    def render(self) -> str:
+        """
+        Метрики в текстовом формате Prometheus
+        """
+        lines = []
+
+        for name, series in self.counters.items():
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in series.items():
+                lines.append(f'{name}{_prometheus_labels(labels)} {value}')
+
+        for name, series in self.gauges.items():
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in series.items():
+                lines.append(f'{name}{_prometheus_labels(labels)} {value}')
+
+        for name, series in self.histograms.items():
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in series.items():
+                for bound, count in histogram.cumulative():
+                    lines.append('{}_bucket{} {}'.format(
+                        name,
+                        _prometheus_labels(labels, f'le="{bound}"'),
+                        count
+                    ))
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    _prometheus_labels(labels, 'le="+Inf"'),
+                    histogram.count
+                ))
+                lines.append(
+                    f'{name}_sum{_prometheus_labels(labels)} {histogram.sum}')
+                lines.append(
+                    f'{name}_count{_prometheus_labels(labels)} '
+                    f'{histogram.count}'
+                )
+
+        lines.append('')
+        return '\n'.join(lines)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.render(),
+            content_type='text/plain',
+            charset='utf-8'
+        )
+
+    async def start(self):
+        if self.port is None or self.runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get(self.path, self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+class StatsdMetrics(Metrics):
+    """
+    Отправка метрик по UDP в StatsD-агент, по умолчанию на localhost.
+    Метки добавляются к имени метрики через точку,
+    гистограммы отправляются как таймеры в миллисекундах
+    """
+
+    __slots__ = (
+        "host",
+        "port",
+        "prefix",
+        "_socket"
+    )
+
+    enabled = True
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 8125,
+            prefix: str = 'async_icq'
+    ):
+        """
+        :param host: адрес StatsD-агента
+        :param port: порт StatsD-агента
+        :param prefix: префикс имен метрик
+        """
+        self.host: str = host
+        self.port: int = port
+        self.prefix: str = prefix
+        self._socket: Optional[socket.socket] = None
+
+    def name(self, name: str, labels: Dict[str, str]) -> str:
+        parts = [self.prefix, name] if self.prefix else [name]
+        for key in sorted(labels):
+            parts.append(
+                str(labels[key]).replace('/', '_').replace('.', '_')
+                .replace(':', '_').replace('|', '_')
+            )
+        return '.'.join(parts)
+
+    def send(self, line: str):
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setblocking(False)
+        try:
+            self._socket.sendto(line.encode(), (self.host, self.port))
+        except OSError:
+            # Метрики не должны ломать бота, если агент недоступен
+            pass
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        self.send(f'{self.name(name, labels)}:{value}|c')
+
+    def set(self, name: str, value: float, **labels: str):
+        self.send(f'{self.name(name, labels)}:{value}|g')
+
+    def observe(self, name: str, value: float, **labels: str):
+        self.send(f'{self.name(name, labels)}:{value * 1000:.3f}|ms')
+
+    async def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+NULL_METRICS = Metrics()
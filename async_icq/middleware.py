@@ -1,3 +1,5 @@
 class BaseBotMiddleware(object):
 
+    # Бот, которому передан middleware: задается AsyncBot при создании
+    # для каждого экземпляра, общего бота по умолчанию нет
     bot = None
@@ -0,0 +1,161 @@
+import asyncio
+
+from contextlib import AsyncExitStack
+from typing import Iterator, List, Optional
+
+import aiohttp
+
+from .bot import AsyncBot
+from .events import EventType
+
+
+class BotPool(object):
+    """
+    Запуск множества ботов в одном процессе и одном event loop.
+
+    Все боты пула используют общий пул соединений для отправки
+    и общий пул для long-poll запросов, события привязаны к получившему
+    их боту, middleware из общих параметров копируется для каждого бота.
+
+    Bot API отдает события только по токену одного бота, поэтому
+    общий планировщик не может объединить long-poll запросы разных
+    ботов в один. Вместо этого каждый бот держит ровно один long-poll
+    в общем пуле поллинга, ограниченном количеством ботов: ожидающий
+    запрос стоит одну задачу и одно соединение и не занимает
+    соединения отправки. Ошибка поллинга одного бота не останавливает
+    остальных.
+    """
+
+    __slots__ = (
+        "loop",
+        "bots",
+        "connection_limit",
+        "connection_limit_per_host",
+        "keepalive_timeout",
+        "dns_cache_ttl",
+        "verify_ssl",
+        "bot_kwargs",
+        "connector",
+        "poll_connector"
+    )
+
+    def __init__(
+            self,
+            loop: Optional[asyncio.AbstractEventLoop] = None,
+            connection_limit: int = 100,
+            connection_limit_per_host: int = 0,
+            keepalive_timeout: float = 15.0,
+            dns_cache_ttl: Optional[int] = 10,
+            verify_ssl: bool = False,
+            **bot_kwargs
+    ):
+        """
+        :param loop: event loop пула, по умолчанию создается новый
+        :param connection_limit: размер общего пула соединений отправки
+        :param connection_limit_per_host: лимит соединений на один хост
+        :param keepalive_timeout: время жизни простаивающего соединения
+        :param dns_cache_ttl: время кэширования DNS, None - без кэша
+        :param verify_ssl: проверять ли SSL-сертификаты
+        :param bot_kwargs: параметры AsyncBot по умолчанию для всех ботов
+        """
+        if loop is None:
+            try:
+                import uvloop
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            except ImportError:
+                pass
+            loop = asyncio.new_event_loop()
+
+        self.loop: asyncio.AbstractEventLoop = loop
+        self.bots: List[AsyncBot] = []
+        self.connection_limit: int = connection_limit
+        self.connection_limit_per_host: int = connection_limit_per_host
+        self.keepalive_timeout: float = keepalive_timeout
+        self.dns_cache_ttl: Optional[int] = dns_cache_ttl
+        self.verify_ssl: bool = verify_ssl
+        self.bot_kwargs = bot_kwargs
+        self.connector: Optional[aiohttp.BaseConnector] = None
+        self.poll_connector: Optional[aiohttp.BaseConnector] = None
+
+    def __len__(self) -> int:
+        return len(self.bots)
+
+    def __iter__(self) -> Iterator[AsyncBot]:
+        return iter(self.bots)
+
+    def add_bot(self, token: str, **kwargs) -> AsyncBot:
+        """
+        Добавить бота в пул
+        :param token: токен бота
+        :param kwargs: параметры AsyncBot, дополняющие параметры пула
+        :return: созданный бот, к нему можно добавлять обработчики
+        """
+        bot = AsyncBot(
+            token=token,
+            loop=self.loop,
+            **{**self.bot_kwargs, **kwargs}
+        )
+        self.bots.append(bot)
+        return bot
+
+    def add_handler(self, handler: List):
+        """
+        Добавить обработчик событий всем ботам пула
+        :param handler: [функция, тип события, команда]
+        """
+        for bot in self.bots:
+            bot.add_handler(list(handler))
+
+    def create_connector(self, limit: int) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=self.connection_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.dns_cache_ttl is not None,
+            ttl_dns_cache=self.dns_cache_ttl,
+            ssl=None if self.verify_ssl else False
+        )
+
+    async def run(self):
+        """
+        Поллинг событий всех ботов пула до остановки
+        """
+        self.connector = self.create_connector(self.connection_limit)
+        # Каждый бот держит открытым один long-poll запрос
+        self.poll_connector = self.create_connector(max(len(self.bots), 1))
+
+        try:
+            async with AsyncExitStack() as stack:
+                for bot in self.bots:
+                    bot.connector = self.connector
+                    bot.poll_connector = self.poll_connector
+                    bot.add_handler(
+                        [bot.help_info, EventType.NEW_MESSAGE, '/help'])
+                    # Сессии и метрики бота закрываются при выходе
+                    await stack.enter_async_context(bot)
+
+                results = await asyncio.gather(
+                    *[bot.start_polling() for bot in self.bots],
+                    return_exceptions=True
+                )
+
+                for bot, result in zip(self.bots, results):
+                    if isinstance(result, Exception):
+                        await bot.logger.error(
+                            f'Polling stopped with error: {result!r}')
+        finally:
+            await self.connector.close()
+            await self.poll_connector.close()
+
+    def start(self):
+        """
+        Запуск поллинга всех ботов пула в текущем потоке
+        """
+        self.loop.run_until_complete(self.run())
+
+    def stop(self):
+        """
+        Остановить поллинг всех ботов пула
+        """
+        for bot in self.bots:
+            bot.stop()
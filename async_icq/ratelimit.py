@@ -0,0 +1,281 @@
+import asyncio
+import heapq
+import itertools
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from .constant import RequestPriority
+
+
+METHOD_PRIORITY: Dict[str, RequestPriority] = {
+    'messages/answerCallbackQuery': RequestPriority.CALLBACK,
+}
+
+request_priority: ContextVar[Optional[RequestPriority]] = ContextVar(
+    'request_priority', default=None)
+
+
+class TokenBucket(object):
+    """
+    Классический token bucket: rate токенов в секунду,
+    не более capacity токенов в запасе
+    """
+
+    __slots__ = (
+        "rate",
+        "capacity",
+        "tokens",
+        "updated"
+    )
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.tokens: float = capacity
+        self.updated: float = now
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Время в секундах до появления свободного токена
+        """
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class RateLimiter(object):
+    """
+    Ограничитель частоты запросов к Bot API.
+
+    Общий token bucket на все запросы и отдельные buckets на каждый chatId.
+    Ожидающие запросы выдаются в порядке приоритета (RequestPriority),
+    поэтому answerCallbackQuery обгоняет массовые рассылки.
+    """
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "chat_rate",
+        "chat_burst",
+        "max_chats",
+        "priorities",
+        "requests",
+        "wait_total",
+        "wait_max",
+        "_bucket",
+        "_chat_buckets",
+        "_waiters",
+        "_counter",
+        "_wakeup",
+        "_pump"
+    )
+
+    def __init__(
+            self,
+            rate: Optional[float] = 30.0,
+            burst: Optional[int] = None,
+            chat_rate: Optional[float] = 1.0,
+            chat_burst: Optional[int] = None,
+            max_chats: int = 10000,
+            priorities: Optional[Dict[str, RequestPriority]] = None
+    ):
+        """
+        :param rate: общий лимит запросов в секунду, None - без лимита
+        :param burst: размер общего запаса запросов, по умолчанию rate
+        :param chat_rate: лимит запросов в секунду в один чат,
+        None - без лимита
+        :param chat_burst: размер запаса запросов в один чат
+        :param max_chats: сколько buckets чатов хранить одновременно
+        :param priorities: приоритеты методов Bot API по path
+        """
+        self.rate: Optional[float] = rate
+        self.burst: float = burst or max(rate or 1, 1)
+        self.chat_rate: Optional[float] = chat_rate
+        self.chat_burst: float = chat_burst or max(chat_rate or 1, 1)
+        self.max_chats: int = max_chats
+        self.priorities: Dict[str, RequestPriority] = \
+            priorities if priorities is not None else METHOD_PRIORITY
+
+        self.requests: int = 0
+        self.wait_total: float = 0.0
+        self.wait_max: float = 0.0
+
+        self._bucket: Optional[TokenBucket] = None
+        self._chat_buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._waiters: List = []
+        self._counter: Iterator[int] = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Количество запросов, ожидающих отправки
+        """
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Метрики ограничителя: глубина очереди и время ожидания
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'requests': self.requests,
+            'wait_total': self.wait_total,
+            'wait_max': self.wait_max,
+            'wait_avg': self.wait_total / self.requests
+            if self.requests else 0.0
+        }
+
+    @staticmethod
+    @contextmanager
+    def priority(priority: RequestPriority):
+        """
+        Задать приоритет всех запросов внутри блока with
+        :param priority: приоритет запросов
+        """
+        token = request_priority.set(priority)
+        try:
+            yield
+        finally:
+            request_priority.reset(token)
+
+    def priority_for(self, path: str) -> RequestPriority:
+        priority = request_priority.get()
+        if priority is not None:
+            return priority
+        return self.priorities.get(path, RequestPriority.DEFAULT)
+
+    def _chat_bucket(self, chatId: str, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chatId)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chat_buckets[chatId] = bucket
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chatId)
+        return bucket
+
+    def _delay(self, chatId: Optional[str], now: float) -> float:
+        if chatId is None or self.chat_rate is None:
+            return 0.0
+        return self._chat_bucket(chatId, now).delay(now)
+
+    async def acquire(self, path: str, chatId: Optional[str] = None) -> float:
+        """
+        Дождаться разрешения на запрос
+        :param path: path метода Bot API
+        :param chatId: чат, в который идет запрос
+        :return: время ожидания в секундах
+        """
+        if self.rate is None and self.chat_rate is None:
+            return 0.0
+
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+            self._bucket = TokenBucket(
+                self.rate, self.burst, started) if self.rate else None
+
+        waiter = loop.create_future()
+        heapq.heappush(self._waiters, (
+            self.priority_for(path), next(self._counter), waiter, chatId
+        ))
+        self._wakeup.set()
+
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run())
+
+        await waiter
+
+        waited = loop.time() - started
+        self.requests += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return waited
+
+    def _grant(self, now: float) -> float:
+        """
+        Выдать разрешение первому по приоритету готовому запросу
+        :return: через сколько секунд стоит повторить попытку
+        """
+        if self._bucket is not None:
+            delay = self._bucket.delay(now)
+            if delay:
+                return delay
+
+        head = self._waiters[0]
+
+        if head[2].done():
+            heapq.heappop(self._waiters)
+            return 0.0
+
+        retry = self._delay(head[3], now)
+
+        if not retry:
+            heapq.heappop(self._waiters)
+            self._release(head, now)
+            return 0.0
+
+        # Первый по приоритету запрос упирается в лимит своего чата,
+        # ищем следующий запрос, который можно отправить сейчас
+        for item in sorted(self._waiters)[1:]:
+
+            if item[2].done():
+                continue
+
+            delay = self._delay(item[3], now)
+            if delay:
+                retry = min(retry, delay)
+                continue
+
+            self._waiters.remove(item)
+            heapq.heapify(self._waiters)
+            self._release(item, now)
+            return 0.0
+
+        return retry
+
+    def _release(self, item, now: float):
+        _, _, waiter, chatId = item
+        if self._bucket is not None:
+            self._bucket.consume()
+        if chatId is not None and self.chat_rate is not None:
+            self._chat_bucket(chatId, now).consume()
+        waiter.set_result(None)
+
+    async def _run(self):
+
+        loop = asyncio.get_event_loop()
+
+        while self._waiters:
+
+            self._wakeup.clear()
+
+            delay = self._grant(loop.time())
+
+            if delay:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0)
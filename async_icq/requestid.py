@@ -0,0 +1,92 @@
+import os
+import itertools
+
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+from uuid import uuid4
+
+
+class RequestId(object):
+    """
+    Идентификатор запроса, строка которого формируется
+    только при первом обращении (лог, трассировка)
+    """
+
+    __slots__ = (
+        "prefix",
+        "number",
+        "_text"
+    )
+
+    def __init__(self, prefix: str, number: int):
+        self.prefix: str = prefix
+        self.number: int = number
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = f'{self.prefix}-{self.number:x}'
+        return self._text
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __eq__(self, other) -> bool:
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+
+class RequestIdGenerator(object):
+    """
+    Генератор идентификаторов запросов на основе счетчика.
+
+    Идентификатор уникален в пределах процесса, префикс из pid
+    и случайной части отличает процессы и перезапуски. В отличие
+    от uuid4 не обращается к os.urandom и не форматирует строку
+    на каждый запрос. Для своей схемы идентификаторов достаточно
+    переопределить next().
+    """
+
+    __slots__ = (
+        "prefix",
+        "_counter"
+    )
+
+    def __init__(self, prefix: Optional[str] = None):
+        """
+        :param prefix: префикс идентификаторов, по умолчанию pid процесса
+        и случайная часть
+        """
+        self.prefix: str = prefix if prefix is not None \
+            else f'{os.getpid():x}{uuid4().hex[:6]}'
+        self._counter: Iterator[int] = itertools.count(1)
+
+    def next(self) -> RequestId:
+        return RequestId(self.prefix, next(self._counter))
+
+
+# Генератор для вызовов без бота: AsyncBot.get_request_id()
+DEFAULT_REQUEST_IDS: RequestIdGenerator = RequestIdGenerator()
+
+
+class RequestIdMethod(object):
+    """
+    Метод get_request_id, совместимый с прежним @staticmethod:
+    bot.get_request_id() берет идентификатор из генератора бота,
+    AsyncBot.get_request_id() - из общего DEFAULT_REQUEST_IDS
+    """
+
+    __slots__ = ()
+
+    def __get__(self, instance, owner=None) -> Callable[[], RequestId]:
+        if instance is None:
+            return DEFAULT_REQUEST_IDS.next
+        return instance.request_ids.next
+
+
+# Идентификатор текущего запроса к Bot API, доступен коду,
+# выполняющемуся внутри запроса (трассировка aiohttp, логирование)
+current_request_id: ContextVar[Optional[RequestId]] = ContextVar(
+    'current_request_id', default=None)
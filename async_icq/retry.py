@@ -0,0 +1,176 @@
+import asyncio
+import random
+import ssl
+
+from typing import FrozenSet, Optional
+
+import aiohttp
+
+
+RETRY_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+# Повтор этих методов после того, как запрос мог дойти до сервера,
+# может продублировать сообщение или чат
+NON_IDEMPOTENT_METHODS: FrozenSet[str] = frozenset({
+    'messages/sendText',
+    'messages/sendFile',
+    'messages/sendVoice',
+    'chats/createChat',
+})
+
+
+class RetryPolicy(object):
+    """
+    Политика повторов запросов при временных ошибках
+    с экспоненциальной задержкой и случайным разбросом (full jitter).
+
+    Неидемпотентные методы повторяются только если запрос
+    гарантированно не был обработан сервером: ошибка установки
+    соединения или ответ 429.
+    """
+
+    __slots__ = (
+        "max_attempts",
+        "base_delay",
+        "max_delay",
+        "jitter",
+        "statuses",
+        "idempotent"
+    )
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay: float = 0.5,
+            max_delay: float = 30.0,
+            jitter: bool = True,
+            statuses: FrozenSet[int] = RETRY_STATUSES,
+            idempotent: Optional[bool] = None
+    ):
+        """
+        :param max_attempts: максимальное количество попыток
+        :param base_delay: задержка перед первым повтором в секундах
+        :param max_delay: максимальная задержка в секундах
+        :param jitter: случайный разброс задержки от 0 до расчетной
+        :param statuses: HTTP-статусы, при которых запрос повторяется
+        :param idempotent: считать ли методы идемпотентными,
+        по умолчанию определяется по NON_IDEMPOTENT_METHODS
+        """
+        self.max_attempts: int = max_attempts
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.jitter: bool = jitter
+        self.statuses: FrozenSet[int] = statuses
+        self.idempotent: Optional[bool] = idempotent
+
+    def is_idempotent(self, path: str) -> bool:
+        if self.idempotent is not None:
+            return self.idempotent
+        return path not in NON_IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Задержка перед повтором
+        :param attempt: номер неудачной попытки, начиная с 0
+        :return: задержка в секундах
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def should_retry(
+            self,
+            path: str,
+            error: BaseException,
+            attempt: int
+    ) -> bool:
+        """
+        Нужно ли повторить запрос после ошибки
+        :param path: path метода Bot API
+        :param error: ошибка запроса
+        :param attempt: номер неудачной попытки, начиная с 0
+        :return: True, если запрос стоит повторить
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+
+        # Ошибка сертификата или TLS не исправится повтором
+        if isinstance(error, (aiohttp.ClientSSLError, ssl.SSLError)):
+            return False
+
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return True
+
+        if isinstance(error, aiohttp.ClientResponseError):
+            if error.status == 429:
+                return 429 in self.statuses
+            return error.status in self.statuses \
+                and self.is_idempotent(path)
+
+        if isinstance(error, (
+                asyncio.TimeoutError,
+                aiohttp.ServerDisconnectedError,
+                aiohttp.ClientOSError
+        )):
+            return self.is_idempotent(path)
+
+        return False
+
+    def retry_after(self, error: BaseException, attempt: int) -> float:
+        """
+        Задержка перед повтором с учетом заголовка Retry-After
+        :param error: ошибка запроса
+        :param attempt: номер неудачной попытки, начиная с 0
+        :return: задержка в секундах
+        """
+        if isinstance(error, aiohttp.ClientResponseError) and error.headers:
+            try:
+                return min(
+                    self.max_delay, float(error.headers['Retry-After']))
+            except (KeyError, ValueError):
+                pass
+        return self.backoff(attempt)
+
+
+class CircuitBreaker(object):
+    """
+    Предохранитель поллинга: после failure_threshold ошибок подряд
+    размыкается и пропускает следующий запрос только через reset_timeout
+    """
+
+    __slots__ = (
+        "failure_threshold",
+        "reset_timeout",
+        "policy",
+        "failures"
+    )
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+            policy: Optional[RetryPolicy] = None
+    ):
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.policy: RetryPolicy = policy or RetryPolicy(
+            max_attempts=failure_threshold, base_delay=0.5, max_delay=10.0)
+        self.failures: int = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def success(self):
+        self.failures = 0
+
+    def failure(self) -> float:
+        """
+        Зафиксировать ошибку
+        :return: задержка перед следующей попыткой в секундах
+        """
+        self.failures += 1
+        if self.is_open:
+            return self.reset_timeout
+        return self.policy.backoff(self.failures - 1)
@@ -0,0 +1,109 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .events import Event, EventType
+
+
+class _CommandNode(object):
+
+    __slots__ = (
+        "children",
+        "handlers"
+    )
+
+    def __init__(self):
+        self.children: Dict[str, '_CommandNode'] = {}
+        self.handlers: List[Tuple[int, Callable]] = []
+
+
+class Router(object):
+    """
+    Индекс обработчиков событий.
+
+    Обработчики без команды группируются по EventType,
+    команды для EventType.NEW_MESSAGE хранятся в префиксном дереве,
+    поэтому поиск обработчиков для сообщения занимает время,
+    пропорциональное длине команды, а не количеству обработчиков.
+    Индекс строится лениво при первом поиске после изменения списка.
+    """
+
+    __slots__ = (
+        "handlers",
+        "_by_type",
+        "_commands",
+        "_compiled"
+    )
+
+    def __init__(self, handlers: List):
+        self.handlers: List = handlers
+        self._by_type: Dict[EventType, List[Tuple[int, Callable]]] = {}
+        self._commands: _CommandNode = _CommandNode()
+        self._compiled: bool = False
+
+    def invalidate(self):
+        """
+        Сбросить индекс после изменения списка обработчиков
+        """
+        self._compiled = False
+
+    def compile(self):
+        """
+        Построить индекс по текущему списку обработчиков
+        """
+        by_type = {}
+        commands = _CommandNode()
+
+        for index, (handler, event_type, cmd) in enumerate(self.handlers):
+
+            if cmd is None:
+                by_type.setdefault(event_type, []).append((index, handler))
+
+            elif event_type == EventType.NEW_MESSAGE:
+                node = commands
+                for char in cmd:
+                    node = node.children.setdefault(char, _CommandNode())
+                node.handlers.append((index, handler))
+
+        self._by_type = by_type
+        self._commands = commands
+        self._compiled = True
+
+    def match_commands(self, text: str) -> List[Tuple[int, Callable]]:
+        """
+        Найти обработчики команд, с которых начинается текст
+        :param text: текст сообщения
+        :return: список пар (порядковый номер, обработчик)
+        """
+        node = self._commands
+        result = list(node.handlers)
+
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            result.extend(node.handlers)
+
+        return result
+
+    def match(self, event: Event) -> List[Callable]:
+        """
+        Найти обработчики события в порядке их добавления
+        :param event: входящее событие
+        :return: список обработчиков
+        """
+        if not self._compiled:
+            self.compile()
+
+        result: Optional[List[Tuple[int, Callable]]] = self._by_type.get(
+            event.type)
+
+        if event.type == EventType.NEW_MESSAGE \
+                and isinstance(event.text, str):
+            commands = self.match_commands(event.text)
+            if commands:
+                result = sorted(
+                    (result or []) + commands, key=lambda x: x[0])
+
+        if not result:
+            return []
+
+        return [handler for _, handler in result]
@@ -0,0 +1,216 @@
+import hmac
+import ipaddress
+import asyncio
+import itertools
+
+from typing import Dict, Iterator, List, Optional
+
+import aiohttp
+
+from aiohttp import web
+
+from . import codec
+from .bot import AsyncBot
+
+SECRET_HEADER = 'X-Webhook-Secret'
+
+
+class WebhookServer(object):
+    """
+    Прием событий, которые шлюз отправляет боту POST-запросами,
+    вместо long-poll запросов events/get.
+
+    Тело запроса - пачка событий в формате ответа events/get:
+    {"events": [...]} или просто список событий. События проходят
+    через тот же конвейер, что и при поллинге: middleware, обработчики,
+    self.bot.dispatcher. Ответ отправляется после постановки событий
+    в очередь обработки, не дожидаясь обработчиков.
+    """
+
+    __slots__ = (
+        "bot",
+        "host",
+        "port",
+        "path",
+        "secret",
+        "app",
+        "runner"
+    )
+
+    def __init__(
+            self,
+            bot: AsyncBot,
+            host: str = '127.0.0.1',
+            port: int = 8080,
+            path: str = '/webhook',
+            secret: Optional[str] = None
+    ):
+        """
+        :param bot: бот, обрабатывающий события
+        :param host: адрес, на котором принимаются запросы,
+        по умолчанию только локальный; на внешнем адресе нужен secret
+        :param port: порт, 0 - любой свободный
+        :param path: путь endpoint-а
+        :param secret: общий секрет шлюза, передается в заголовке
+        X-Webhook-Secret, None - без проверки
+        """
+        self.bot: AsyncBot = bot
+        self.host: str = host
+        self.port: int = port
+        self.path: str = path
+        self.secret: Optional[str] = secret
+
+        # Без секрета события может прислать любой, кто видит адрес
+        if secret is None and not self.local:
+            raise ValueError(
+                f'Webhook on non-local host {host} requires a secret')
+
+        self.app: web.Application = web.Application()
+        self.app.router.add_post(path, self.handle)
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Адрес endpoint-а запущенного сервера
+        """
+        host, port = self.runner.addresses[0][:2]
+        return f'http://{host}:{port}{self.path}'
+
+    @property
+    def local(self) -> bool:
+        """
+        Запросы принимаются только с локального адреса
+        """
+        try:
+            return ipaddress.ip_address(self.host).is_loopback
+        except ValueError:
+            return self.host == 'localhost'
+
+    async def handle(self, request: web.Request) -> web.Response:
+
+        if self.secret is not None and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ''), self.secret):
+            return web.json_response(
+                {'ok': False, 'description': 'Invalid secret'}, status=403)
+
+        try:
+            body = codec.loads(await request.read())
+            events = body['events'] if isinstance(body, dict) else body
+            if not isinstance(events, list):
+                raise ValueError(f'Unsupported events batch: {type(events)}')
+            # Пачка принимается целиком или отклоняется целиком
+            events = [self.bot.build_event(event) for event in events]
+            if any(event.eventId is None for event in events):
+                raise ValueError('Event without eventId')
+        except (ValueError, KeyError, TypeError) as error:
+            await self.bot.logger.warning(f'Bad webhook request: {error}')
+            return web.json_response(
+                {'ok': False, 'description': str(error)}, status=400)
+
+        if events:
+            # Шлюз ждет ответа, пока обработчики не разберут очередь
+            await self.bot.wait_backpressure()
+            self.bot.lastEventId = max(
+                self.bot.lastEventId,
+                max(event.eventId for event in events)
+            )
+            await self.bot.schedule_events(events)
+
+        return web.json_response({'ok': True})
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def serve(self, interval: float = 0.5):
+        """
+        Прием событий до остановки бота (bot.stop()).
+        При остановке ожидает завершения начатых обработчиков
+        :param interval: период проверки остановки бота в секундах
+        """
+        async with self.bot:
+            await self.start()
+            await self.bot.logger.info(f'Webhook is listening on {self.url}')
+            try:
+                while self.bot.running:
+                    await asyncio.sleep(interval)
+            except KeyboardInterrupt as error:
+                await self.bot.logger.info(
+                    f'Stopping bot after {type(error)}')
+            finally:
+                await self.stop()
+                await self.bot.dispatcher.drain(
+                    timeout=self.bot.drain_timeout)
+                self.bot.backpressure.reset()
+                if self.bot.checkpoint is not None:
+                    await self.bot.checkpoint.close()
+
+
+class FakeGateway(object):
+    """
+    Локальный шлюз для тестов: отправляет пачки событий
+    в WebhookServer так же, как это делает настоящий шлюз
+    """
+
+    __slots__ = (
+        "url",
+        "secret",
+        "session",
+        "_event_ids"
+    )
+
+    def __init__(self, url: str, secret: Optional[str] = None):
+        """
+        :param url: адрес endpoint-а WebhookServer
+        :param secret: общий секрет шлюза
+        """
+        self.url: str = url
+        self.secret: Optional[str] = secret
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._event_ids: Iterator[int] = itertools.count(1)
+
+    def event(self, type_: str, payload: Dict) -> Dict:
+        """
+        Событие в формате Bot API со следующим eventId
+        """
+        return {
+            'eventId': next(self._event_ids),
+            'type': type_,
+            'payload': payload
+        }
+
+    async def push(self, events: List[Dict]) -> Dict:
+        """
+        Отправить пачку событий
+        :param events: события в формате Bot API
+        :return: ответ WebhookServer
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        headers = {SECRET_HEADER: self.secret} if self.secret else {}
+
+        async with self.session.post(
+                self.url,
+                data=codec.dumps({'events': events}),
+                headers={'Content-Type': 'application/json', **headers}
+        ) as response:
+            return codec.loads(await response.read())
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> 'FakeGateway':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
@@ -0,0 +1,283 @@
+import os
+import queue
+import signal
+import asyncio
+import zlib
+import multiprocessing
+
+from typing import Dict, List, Optional
+
+from .bot import AsyncBot
+from .events import EventType
+
+
+# Event loop родителя, унаследованные рабочим процессом. Его selector
+# (epoll) и self-pipe общие с родителем: сборка мусора закрыла бы loop
+# и сняла бы их регистрацию, после чего родитель перестает получать
+# пробуждения от пула потоков (run_in_executor). Поэтому loop хранится
+# до завершения процесса и никогда не закрывается
+_inherited_loops: List[asyncio.AbstractEventLoop] = []
+
+
+class WorkerAcks(object):
+    """
+    Позиция обработки в рабочем процессе: вместо сохранения
+    отправляет eventId обработанных событий процессу поллинга,
+    который и фиксирует позицию
+    """
+
+    __slots__ = (
+        "queue",
+    )
+
+    def __init__(self, queue_: multiprocessing.Queue):
+        self.queue: multiprocessing.Queue = queue_
+
+    def seen(self, eventId: int) -> bool:
+        # Повторы отбрасывает процесс поллинга
+        return False
+
+    def begin(self, eventId: int):
+        pass
+
+    def complete(self, eventId: int):
+        self.queue.put(eventId)
+
+    async def close(self):
+        pass
+
+
+class WorkerPool(object):
+    """
+    Многопроцессный режим бота.
+
+    Текущий процесс поллит events/get и раскладывает события по очередям
+    processes рабочих процессов, каждый из которых выполняет обработчики
+    бота в своем event loop. События одного чата всегда попадают в один
+    процесс, поэтому порядок их обработки сохраняется
+    с DispatchMode.PER_CHAT.
+
+    Рабочие процессы создаются через fork и получают копию бота со всеми
+    обработчиками, поэтому режим доступен только на POSIX-системах.
+    Общий лимит rate_limiter делится между рабочими процессами поровну.
+    Позицию bot.checkpoint фиксирует процесс поллинга, когда рабочий
+    процесс подтверждает, что обработчики события завершились.
+    """
+
+    __slots__ = (
+        "bot",
+        "processes",
+        "queue_size",
+        "join_timeout",
+        "queues",
+        "workers",
+        "acks"
+    )
+
+    def __init__(
+            self,
+            bot: AsyncBot,
+            processes: Optional[int] = None,
+            queue_size: int = 1000,
+            join_timeout: Optional[float] = None
+    ):
+        """
+        :param bot: бот, события которого обрабатываются
+        :param processes: количество рабочих процессов,
+        по умолчанию количество ядер
+        :param queue_size: максимальное количество пачек событий в очереди
+        одного процесса, при заполнении поллинг ждет рабочий процесс
+        :param join_timeout: сколько ждать завершения рабочих процессов
+        при остановке, None - без ограничения
+        """
+        self.bot: AsyncBot = bot
+        self.processes: int = processes or os.cpu_count() or 1
+        self.queue_size: int = queue_size
+        self.join_timeout: Optional[float] = join_timeout
+        self.queues: List[multiprocessing.Queue] = []
+        self.workers: List[multiprocessing.Process] = []
+        self.acks: Optional[multiprocessing.Queue] = None
+
+    def shard(self, payload: Dict) -> int:
+        """
+        Номер рабочего процесса для события
+        :param payload: payload события в формате Bot API
+        :return: индекс рабочего процесса
+        """
+        chatId = self.bot.payload_chat_id(payload)
+        if chatId is None:
+            return 0
+        return zlib.crc32(chatId.encode()) % self.processes
+
+    def start(self):
+        """
+        Запуск рабочих процессов и поллинга в текущем процессе
+        до остановки бота
+        """
+        context = multiprocessing.get_context('fork')
+
+        self.bot.add_handler(
+            [self.bot.help_info, EventType.NEW_MESSAGE, '/help'])
+
+        # fork до запуска поллинга: дочерние процессы не наследуют
+        # сессии, задачи и соединения родителя. Сам event loop бота
+        # уже создан и наследуется, см. worker_main
+        self.queues = [
+            context.Queue(self.queue_size) for _ in range(self.processes)
+        ]
+        if self.bot.checkpoint is not None:
+            self.acks = context.Queue()
+        self.workers = [
+            context.Process(
+                target=self.worker_main,
+                args=(index,),
+                name=f'async-icq-worker-{index}',
+                daemon=True
+            )
+            for index in range(self.processes)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        try:
+            self.bot.loop.run_until_complete(self.poll())
+        finally:
+            self.join()
+
+    async def poll(self):
+        checkpoint = self.bot.checkpoint
+        loop = asyncio.get_event_loop()
+
+        async with self.bot:
+            acks = asyncio.ensure_future(self.collect_acks()) \
+                if self.acks is not None else None
+            try:
+                await self.bot.poll_events(self.distribute)
+            finally:
+                # Подтверждения приходят, пока рабочие процессы
+                # дообрабатывают уже полученные события
+                await loop.run_in_executor(None, self.join)
+                if acks is not None:
+                    self.acks.put(None)
+                    await acks
+                    self.acks.close()
+                if checkpoint is not None:
+                    await checkpoint.close()
+
+    async def collect_acks(self):
+        """
+        Фиксация событий, обработку которых подтвердили рабочие процессы
+        """
+        loop = asyncio.get_event_loop()
+
+        while True:
+            eventId = await loop.run_in_executor(None, self.acks.get)
+            if eventId is None:
+                return
+            self.bot.checkpoint.complete(eventId)
+
+    async def distribute(self, events: List):
+        """
+        Разложить пачку событий по очередям рабочих процессов
+        :param events: события в формате Bot API
+        """
+        checkpoint = self.bot.checkpoint
+
+        shards: Dict[int, List] = {}
+
+        for event in events:
+            try:
+                self.bot.build_event(event)
+            except ValueError as error:
+                await self.bot.skip_event(event, error)
+                continue
+
+            eventId = event.get("eventId")
+
+            if checkpoint is not None and eventId is not None:
+                if checkpoint.seen(eventId):
+                    continue
+                checkpoint.begin(eventId)
+
+            shards.setdefault(
+                self.shard(event["payload"]), []).append(event)
+
+        for index, batch in shards.items():
+            await self.put(self.queues[index], batch)
+
+    @staticmethod
+    async def put(queue_: multiprocessing.Queue, item):
+        try:
+            queue_.put_nowait(item)
+        except queue.Full:
+            # Рабочий процесс не успевает: ждем место, не блокируя loop
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, queue_.put, item)
+
+    def join(self):
+        """
+        Остановить рабочие процессы после обработки уже полученных событий
+        """
+        for queue_ in self.queues:
+            queue_.put(None)
+
+        for worker in self.workers:
+            worker.join(self.join_timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+        for queue_ in self.queues:
+            queue_.close()
+
+        # Повторный вызов (после poll) ничего не делает
+        self.queues = []
+        self.workers = []
+
+    def worker_main(self, index: int):
+        """
+        Точка входа рабочего процесса
+        :param index: индекс рабочего процесса
+        """
+        # Остановкой управляет процесс поллинга через очередь
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        # Позицию фиксирует процесс поллинга по подтверждениям
+        self.bot.checkpoint = WorkerAcks(self.acks) \
+            if self.acks is not None else None
+
+        # Идентификаторы запросов процессов не должны совпадать
+        self.bot.request_ids.prefix = f'{self.bot.request_ids.prefix}w{index}'
+
+        limiter = self.bot.rate_limiter
+        if limiter is not None and limiter.rate is not None:
+            limiter.rate /= self.processes
+            limiter.burst = max(limiter.burst / self.processes, 1)
+
+        _inherited_loops.append(self.bot.loop)
+        self.bot.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.bot.loop)
+        try:
+            self.bot.loop.run_until_complete(self.consume(self.queues[index]))
+        finally:
+            self.bot.loop.close()
+
+    async def consume(self, queue_: multiprocessing.Queue):
+        """
+        Обработка событий из очереди до получения None
+        :param queue_: очередь рабочего процесса
+        """
+        loop = asyncio.get_event_loop()
+
+        async with self.bot:
+            try:
+                while True:
+                    # Переполненная очередь процесса останавливает поллинг
+                    await self.bot.wait_backpressure()
+                    events = await loop.run_in_executor(None, queue_.get)
+                    if events is None:
+                        break
+                    await self.bot.dispatch_events(events)
+            finally:
+                await self.bot.dispatcher.drain(
+                    timeout=self.bot.drain_timeout)
+                self.bot.backpressure.reset()
@@ -15,7 +15,7 @@ class AuthMiddleWare(BaseBotMiddleware):
 
     async def check(self, event: Event) -> bool:
 
-        await AuthMiddleWare.bot.logger.debug(f'Checking event: {event.data}')
+        await self.bot.logger.debug(f'Checking event: {event.data}')
 
         if event.chat.chatId != self.chat_id:
             return False
@@ -28,7 +28,7 @@ class AuthMiddleWare(BaseBotMiddleware):
 
                 return False
 
-            await AuthMiddleWare.bot.delete_msg(
+            await self.bot.delete_msg(
                 chatId=event.chat.chatId,
                 msgId=[event.msgId]
             )
@@ -37,7 +37,7 @@ class AuthMiddleWare(BaseBotMiddleware):
 
             text += '\n'.join([f'@[{user}]' for user in self.list])
 
-            await AuthMiddleWare.bot.send_text(
+            await self.bot.send_text(
                 chatId=event.from_.userId,
                 text=text
             )
@@ -45,7 +45,7 @@ class AuthMiddleWare(BaseBotMiddleware):
             text = f'User @[{event.from_.userId}] ' \
                    f'isn\'t allowed to talk in this chat'
 
-            await AuthMiddleWare.bot.send_text(
+            await self.bot.send_text(
                 chatId=event.chat.chatId,
                 text=text
             )
@@ -98,6 +98,12 @@ setuptools.setup(
     # предоставляет pip некоторые метаданные о пакете.
     # Также отображается на странице PyPi.
     install_requires=requirements,
+    # Необязательные быстрые JSON-кодеки, выбираются автоматически
+    # при установке: pip install async_icq[orjson]
+    extras_require={
+        "orjson": ["orjson>=3.6.0"],
+        "ujson": ["ujson>=5.1.0"],
+    },
     classifiers=[
         "Intended Audience :: Developers",
         "Topic :: Software Development :: Libraries :: Python Modules",
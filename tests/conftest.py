@@ -0,0 +1,204 @@
+import asyncio
+
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from aiohttp import web
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.events import Event, EventType
+
+
+def payload(
+        text: Optional[str] = 'text',
+        chatId: str = 'chat',
+        msgId: str = '1'
+) -> Dict:
+    """
+    Payload сообщения в формате Bot API
+    """
+    return {
+        'text': text,
+        'chat': {'chatId': chatId, 'type': 'private'},
+        'from': {'userId': 'user'},
+        'msgId': msgId
+    }
+
+
+def event(eventId: int, type_: str = 'newMessage', **fields) -> Dict:
+    """
+    Событие events/get с payload сообщения, text и msgId - номер события
+    """
+    return {
+        'eventId': eventId,
+        'type': type_,
+        'payload': payload(
+            **{'text': str(eventId), 'msgId': str(eventId), **fields})
+    }
+
+
+def message(text: Optional[str] = 'text', bot=None) -> Event:
+    """
+    Входящее сообщение
+    """
+    return Event(type_=EventType.NEW_MESSAGE, data=payload(text), bot=bot)
+
+
+class FakeApi(object):
+    """
+    Локальный Bot API для тестов: записывает запросы, отдает события
+    по токенам и по запросу отвечает ошибками
+    """
+
+    def __init__(self):
+        self.requests: List[Tuple[str, str, List, bytes]] = []
+        self.events: Dict[str, List[Dict]] = {}
+        self.errors: Dict[str, List[Tuple[int, Dict]]] = {}
+        self.file_data: bytes = bytes(range(256)) * 40
+        self.file_ranges: bool = True
+        self.upload_delay: float = 0.0
+        self.poll_delay: float = 0.05
+        self.runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/file/data', self.file)
+        self.app.router.add_route('*', '/bot/v1/{path:.*}', self.handle)
+
+    def push(self, token: str, type_: str, payload: Dict) -> Dict:
+        events = self.events.setdefault(token, [])
+        event = {
+            'eventId': len(events) + 1,
+            'type': type_,
+            'payload': payload
+        }
+        events.append(event)
+        return event
+
+    def fail(
+            self,
+            path: str,
+            status: int,
+            times: int = 1,
+            headers: Optional[Dict] = None
+    ):
+        self.errors.setdefault(path, []).extend(
+            [(status, headers or {})] * times)
+
+    def calls(self, path: str) -> List[Tuple[str, str, List, bytes]]:
+        return [request for request in self.requests if request[1] == path]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.match_info['path']
+        body = await request.read()
+        self.requests.append(
+            (request.method, path, list(request.query.items()), body))
+
+        errors = self.errors.get(path)
+        if errors:
+            status, headers = errors.pop(0)
+            return web.json_response(
+                {'ok': False}, status=status, headers=headers)
+
+        if path == 'events/get':
+            return await self.events_get(request)
+
+        if path == 'files/getInfo':
+            return web.json_response({
+                'type': 'text',
+                'size': len(self.file_data),
+                'filename': 'data.bin',
+                'url': f'{self.url}/file/data'
+            })
+
+        if path in ('messages/sendFile', 'messages/sendVoice') \
+                and request.method == 'POST':
+            await asyncio.sleep(self.upload_delay)
+            return web.json_response(
+                {'ok': True, 'msgId': '1', 'fileId': f'file{len(body)}'})
+
+        return web.json_response({'ok': True, 'msgId': '1'})
+
+    async def events_get(self, request: web.Request) -> web.Response:
+        token = request.query['token']
+        lastEventId = int(request.query.get('lastEventId', 0))
+        events = [
+            event for event in self.events.get(token, [])
+            if event['eventId'] > lastEventId
+        ]
+        if not events:
+            await asyncio.sleep(self.poll_delay)
+        return web.json_response({'ok': True, 'events': events})
+
+    async def file(self, request: web.Request) -> web.Response:
+        self.requests.append(
+            ('GET', 'file', [('Range', request.headers.get('Range'))], b''))
+
+        data = self.file_data
+        range_ = request.headers.get('Range')
+
+        if not self.file_ranges or range_ is None:
+            return web.Response(body=data)
+
+        start = int(range_.split('=')[1].split('-')[0])
+        if start >= len(data):
+            return web.Response(status=416)
+
+        return web.Response(
+            status=206,
+            body=data[start:],
+            headers={
+                'Content-Range': f'bytes {start}-{len(data) - 1}/{len(data)}'
+            }
+        )
+
+    async def start(self) -> 'FakeApi':
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.url = f'http://{host}:{port}'
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+@pytest.fixture
+def make_payload():
+    return payload
+
+
+@pytest.fixture
+def make_event():
+    return event
+
+
+@pytest.fixture
+def make_message():
+    return message
+
+
+@pytest.fixture
+async def api():
+    fake = await FakeApi().start()
+    yield fake
+    await fake.stop()
+
+
+@pytest.fixture
+async def bot(api):
+    # Ошибки логируются, а stdout под pytest - не pipe: aiologger
+    # не может в него писать
+    instance = AsyncBot(
+        token='TOKEN',
+        url=api.url,
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL,
+        pollTime=1
+    )
+    yield instance
+    await instance.close()
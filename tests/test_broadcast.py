@@ -0,0 +1,58 @@
+import json
+
+import aiohttp
+
+from async_icq.helpers import InlineKeyboardMarkup, KeyboardButton
+
+
+def chat_ids(api, path):
+    return [dict(request[2])['chatId'] for request in api.calls(path)]
+
+
+async def test_send_text_many_collects_results_and_errors(api, bot):
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='a', callbackData='b'))
+    api.fail('messages/sendText', 403)
+
+    results = await bot.send_text_many(
+        [f'chat{i}' for i in range(10)],
+        text='hi',
+        inlineKeyboardMarkup=keyboard,
+        concurrency=3
+    )
+
+    errors = [
+        chatId for chatId, result in results.items()
+        if isinstance(result, aiohttp.ClientResponseError)
+    ]
+
+    assert sorted(chat_ids(api, 'messages/sendText')) == sorted(results)
+    assert len(results) == 10 and len(errors) == 1
+    assert all(
+        results[chatId] == {'ok': True, 'msgId': '1'}
+        for chatId in results if chatId not in errors
+    )
+    assert all(
+        json.loads(dict(request[2])['inlineKeyboardMarkup']) ==
+        keyboard.to_dic()
+        for request in api.calls('messages/sendText')
+    )
+
+
+async def test_send_file_many_uploads_once(api, bot):
+    results = await bot.send_file_many(
+        ['chat1', 'chat2', 'chat3'], file_path=b'data', concurrency=2)
+
+    uploads = [
+        request for request in api.calls('messages/sendFile')
+        if request[0] == 'POST'
+    ]
+    sent = [
+        dict(request[2])['fileId']
+        for request in api.calls('messages/sendFile')
+        if request[0] == 'GET'
+    ]
+
+    assert len(uploads) == 1
+    assert sent == [results['chat1']['fileId']] * 2
+    assert set(results) == {'chat1', 'chat2', 'chat3'}
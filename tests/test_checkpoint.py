@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.workers import WorkerAcks
+from async_icq.checkpoint import Checkpointer, FileCheckpointStore, \
+    SQLiteCheckpointStore
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('store_type', ['file', 'sqlite'])
+async def test_checkpoint_commits_after_handlers(tmp_path, store_type):
+
+    def make_store():
+        if store_type == 'file':
+            return FileCheckpointStore(str(tmp_path / 'checkpoint.json'))
+        return SQLiteCheckpointStore(str(tmp_path / 'checkpoint.db'))
+
+    checkpoint = Checkpointer(make_store(), batch_size=1)
+
+    for eventId in (1, 2, 3, 4):
+        checkpoint.begin(eventId)
+
+    checkpoint.complete(1)
+    checkpoint.complete(3)
+    await checkpoint.close()
+
+    # Событие 2 не обработано: позиция не проходит дальше 1,
+    # а обработанное 3 не повторяется после перезапуска
+    restored = Checkpointer(make_store())
+    assert restored.lastEventId == 1
+    assert not restored.seen(2)
+    assert restored.seen(3)
+    assert not restored.seen(4)
+
+    restored.begin(2)
+    restored.begin(4)
+    restored.complete(2)
+    assert restored.lastEventId == 3
+    restored.complete(4)
+    assert restored.lastEventId == 4
+    await restored.close()
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_skips_invalid_and_keeps_cancelled(
+        tmp_path, make_event):
+    checkpoint = Checkpointer(
+        FileCheckpointStore(str(tmp_path / 'checkpoint.json')))
+    bot = AsyncBot(
+        token='TOKEN',
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL,
+        checkpoint=checkpoint
+    )
+
+    @bot.message_handler()
+    async def handler(event):
+        if event.eventId == 4:
+            await asyncio.sleep(10)
+
+    await bot.dispatch_events([
+        make_event(1), make_event(2, type_='bogus'), make_event(3)
+    ])
+    await bot.dispatcher.drain()
+
+    # Неверное событие не останавливает позицию
+    assert checkpoint.lastEventId == 3
+    assert not checkpoint.pending
+
+    await bot.dispatch_events([make_event(4)])
+    await bot.dispatcher.drain(timeout=0.01)
+
+    # Прерванный обработчик не фиксирует событие
+    assert checkpoint.lastEventId == 3
+    assert checkpoint.pending == {4}
+    await checkpoint.close()
+
+
+def test_worker_acks_completed_events():
+    acks = multiprocessing.get_context('fork').Queue()
+    worker_checkpoint = WorkerAcks(acks)
+
+    assert not worker_checkpoint.seen(1)
+    worker_checkpoint.begin(1)
+    worker_checkpoint.complete(1)
+
+    assert acks.get(timeout=1) == 1
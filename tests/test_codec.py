@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from async_icq import codec, methods
+from async_icq.helpers import InlineKeyboardMarkup, KeyboardButton
+
+
+@pytest.fixture
+def restore_codec():
+    selected = codec.codec
+    yield
+    codec.codec = selected
+
+
+def test_fastest_available_codec_is_default(monkeypatch):
+    assert codec.get_codec().name == next(
+        name for name in ('orjson', 'ujson', 'json') if name in codec.CODECS)
+
+    monkeypatch.setattr(codec, 'CODECS', {'json': codec.CODECS['json']})
+
+    assert codec.get_codec().name == 'json'
+    with pytest.raises(ValueError):
+        codec.get_codec('orjson')
+
+
+@pytest.mark.parametrize('name', sorted(codec.CODECS))
+def test_codecs_dump_str_and_load_bytes(name, restore_codec):
+    assert codec.set_codec(name) is codec.codec
+
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='ы', callbackData='b'))
+    query = methods.SEND_TEXT.build('TOKEN', {
+        'chatId': 'chat', 'inlineKeyboardMarkup': keyboard
+    })
+    dumped = methods.query_value(query, 'inlineKeyboardMarkup')
+
+    assert isinstance(dumped, str)
+    assert json.loads(dumped) == keyboard.to_dic()
+    assert codec.loads(dumped.encode()) == keyboard.to_dic()
+
+
+def test_unknown_codec_keeps_selected(restore_codec):
+    selected = codec.codec
+
+    with pytest.raises(ValueError):
+        codec.set_codec('pickle')
+
+    assert codec.codec is selected
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.dispatcher import Dispatcher, ChatDispatcher, Backpressure
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_limit():
+
+    dispatcher = Dispatcher(limit=2)
+
+    running = 0
+    max_running = 0
+
+    async def handler():
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for _ in range(10):
+        await dispatcher.schedule(handler())
+
+    assert await dispatcher.drain()
+    assert max_running == 2
+    assert dispatcher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drain_timeout():
+
+    dispatcher = Dispatcher(limit=5)
+
+    await dispatcher.schedule(asyncio.sleep(10))
+
+    assert not await dispatcher.drain(timeout=0.01)
+    assert dispatcher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_dispatcher_order():
+
+    dispatcher = ChatDispatcher(limit=10, queue_size=2, idle_timeout=0.05)
+
+    handled = {}
+
+    async def handler(chat_id, i):
+        await asyncio.sleep(0.001 * (5 - i))
+        handled.setdefault(chat_id, []).append(i)
+
+    for i in range(5):
+        for chat_id in ('a', 'b', 'c'):
+            await dispatcher.schedule(handler(chat_id, i), key=chat_id)
+
+    assert await dispatcher.drain()
+    assert handled == {chat_id: list(range(5)) for chat_id in 'abc'}
+
+
+@pytest.mark.asyncio
+async def test_chat_dispatcher_reaping():
+
+    dispatcher = ChatDispatcher(limit=10, idle_timeout=0.01)
+
+    await dispatcher.schedule(asyncio.sleep(0), key='a')
+
+    assert 'a' in dispatcher.queues
+
+    await asyncio.sleep(0.05)
+
+    assert not dispatcher.queues
+    assert not dispatcher.workers
+
+
+@pytest.mark.asyncio
+async def test_backpressure_watermarks():
+
+    backpressure = Backpressure(high_watermark=4, low_watermark=1)
+
+    backpressure.add(3)
+    assert not backpressure.paused
+    backpressure.add()
+    assert backpressure.paused
+
+    waiter = asyncio.ensure_future(backpressure.wait())
+
+    backpressure.done(2)
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    backpressure.done()
+    await asyncio.wait_for(waiter, 1)
+    assert backpressure.depth == 1
+    assert not backpressure.paused
+
+
+@pytest.mark.asyncio
+async def test_invalid_event_is_skipped_without_leaking_depth(make_event):
+    # Пропуск событий логируется, stdout под pytest - не pipe
+    bot = AsyncBot(
+        token='TOKEN',
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL
+    )
+    received = []
+
+    @bot.message_handler()
+    async def handler(event):
+        received.append(event.eventId)
+
+    await bot.dispatch_events([
+        make_event(1),
+        make_event(2, type_='bogus'),
+        {'eventId': 3, 'type': 'newMessage'},
+        'garbage',
+        make_event(4)
+    ])
+    await bot.dispatcher.drain()
+
+    assert received == [1, 4]
+    assert bot.queue_depth == 0
@@ -0,0 +1,59 @@
+import pytest
+
+
+def ranges(api):
+    return [dict(request[2])['Range'] for request in api.calls('file')]
+
+
+async def test_download_to_directory(api, bot, tmp_path):
+    dest = await bot.download_file('FILE', str(tmp_path), chunk_size=1000)
+
+    assert dest == str(tmp_path / 'data.bin')
+    assert (tmp_path / 'data.bin').read_bytes() == api.file_data
+    assert ranges(api) == [None]
+
+
+@pytest.mark.parametrize('supports_ranges', [True, False])
+async def test_download_resumes_partial_file(
+        api, bot, tmp_path, supports_ranges):
+    api.file_ranges = supports_ranges
+    dest = tmp_path / 'data.bin'
+    dest.write_bytes(api.file_data[:3000])
+
+    await bot.download_file('FILE', str(dest))
+
+    assert dest.read_bytes() == api.file_data
+    assert ranges(api) == ['bytes=3000-']
+
+
+async def test_download_of_complete_file_is_skipped(api, bot, tmp_path):
+    dest = tmp_path / 'data.bin'
+    dest.write_bytes(api.file_data)
+
+    await bot.download_file('FILE', str(dest))
+    await bot.download_file('FILE', str(dest))
+
+    assert dest.read_bytes() == api.file_data
+    assert len(api.calls('files/getInfo')) == 1
+
+
+@pytest.mark.parametrize('supports_ranges', [True, False])
+async def test_iter_file_from_offset(api, bot, supports_ranges):
+    api.file_ranges = supports_ranges
+
+    chunks = [
+        chunk async for chunk in bot.iter_file(
+            'FILE', chunk_size=700, offset=1500)
+    ]
+
+    assert b''.join(chunks) == api.file_data[1500:]
+    assert all(len(chunk) <= 700 for chunk in chunks)
+
+
+async def test_failed_file_info_is_not_cached(api, bot):
+    api.fail('files/getInfo', 200)
+
+    assert (await bot.file_info('FILE')) == {'ok': False}
+    assert (await bot.file_info('FILE'))['url']
+    assert (await bot.file_info('FILE'))['url']
+    assert len(api.calls('files/getInfo')) == 2
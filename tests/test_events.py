@@ -0,0 +1,68 @@
+import pickle
+
+import pytest
+
+from async_icq.events import Event, EventType, _UNSET
+
+
+MESSAGE = {
+    'msgId': '7',
+    'text': 'hi',
+    'chat': {'chatId': 'chat', 'type': 'group', 'title': 'Chat'},
+    'from': {'userId': 'user', 'firstName': 'User'},
+}
+
+
+def test_fields_are_parsed_on_first_access():
+    event = Event(EventType.NEW_MESSAGE, dict(MESSAGE), eventId=1)
+
+    assert event._chat is _UNSET and event._from is _UNSET
+    assert event.text == 'hi' and event.msgId == '7'
+
+    chat = event.chat
+
+    assert chat.chatId == 'chat' and event.chat is chat
+    assert event.from_.userId == 'user'
+    assert event.newMembers is None and event.cb_message is None
+    assert event._proxy is None
+
+    with pytest.raises(TypeError):
+        event.data['text'] = 'changed'
+
+
+def test_callback_message_is_bound_to_bot():
+    bot = object()
+    event = Event(EventType.CALLBACK_QUERY, {
+        'queryId': 'q',
+        'callbackData': 'yes',
+        'from': {'userId': 'user'},
+        'message': dict(MESSAGE),
+    }, bot=bot)
+
+    assert event.chat is None
+    assert event.from_.userId == 'user'
+    assert event.cb_message.bot is bot
+    assert event.cb_message.chat.chatId == 'chat'
+
+
+def test_pickled_event_drops_bot_and_cache():
+    event = Event(EventType.NEW_MESSAGE, dict(MESSAGE), bot=object(), eventId=3)
+    event.chat
+
+    restored = pickle.loads(pickle.dumps(event))
+
+    assert restored.bot is None and restored.eventId == 3
+    assert restored._chat is _UNSET
+    assert restored.chat.chatId == 'chat'
+
+
+async def test_polled_event_answers_through_its_bot(api, bot):
+    api.push('TOKEN', 'newMessage', dict(MESSAGE))
+
+    async with bot:
+        event = bot.build_event((await bot.get_events())[0])
+        await event.answer('hello')
+
+    request, = api.calls('messages/sendText')
+    assert event.bot is bot and event.eventId == 1
+    assert dict(request[2])['chatId'] == 'chat'
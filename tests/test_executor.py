@@ -0,0 +1,94 @@
+import pickle
+import asyncio
+import threading
+import functools
+
+import pytest
+
+from async_icq.bot import AsyncBot
+
+from async_icq.constant import HandlerExecutor
+from async_icq.events import EventType
+from async_icq.executor import HandlerExecutors, handler_executor, \
+    process_handler, is_coroutine_handler
+
+
+@pytest.mark.asyncio
+async def test_sync_handler_runs_in_thread_pool(make_message):
+    executors = HandlerExecutors(threads=2)
+
+    def handler(event):
+        return threading.current_thread().name, event.text
+
+    try:
+        name, text = await executors.run(
+            handler, make_message(bot=object()))
+    finally:
+        executors.shutdown()
+
+    assert name.startswith('async-icq-handler')
+    assert text == 'text'
+
+
+def test_process_handler_event_is_picklable(make_message):
+    @process_handler
+    def handler(event):
+        pass
+
+    assert handler_executor(handler) == HandlerExecutor.PROCESS
+
+    event = pickle.loads(pickle.dumps(make_message(bot=object())))
+
+    assert event.bot is None
+    assert event.chat.chatId == 'chat'
+
+
+def test_coroutine_handlers_are_detected():
+
+    async def handler(event):
+        pass
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(event):
+            return func(event)
+        return wrapper
+
+    class Handler(object):
+        async def __call__(self, event):
+            pass
+
+    assert is_coroutine_handler(handler)
+    assert is_coroutine_handler(decorator(handler))
+    assert is_coroutine_handler(functools.partial(handler))
+    assert is_coroutine_handler(Handler())
+    assert not is_coroutine_handler(lambda event: None)
+
+
+@pytest.mark.asyncio
+async def test_wrapped_coroutine_handler_runs(make_message):
+    bot = AsyncBot(token='TOKEN', loop=asyncio.get_event_loop())
+    received = []
+
+    async def handler(event):
+        received.append(event.text)
+
+    # Обертка без functools.wraps: корутина ожидается в event loop
+    bot.add_handler(
+        [lambda event: handler(event), EventType.NEW_MESSAGE, None])
+    bot.add_handler(
+        [RecordingHandler(received), EventType.NEW_MESSAGE, None])
+
+    await bot.handle_event(make_message(bot=object()))
+    bot.executors.shutdown()
+
+    assert received == ['text', 'text']
+
+
+class RecordingHandler(object):
+
+    def __init__(self, received):
+        self.received = received
+
+    async def __call__(self, event):
+        self.received.append(event.text)
@@ -0,0 +1,91 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.filecache import FileIdCache
+
+
+@pytest.fixture
+async def cached_bot(api):
+    instance = AsyncBot(
+        token='TOKEN',
+        url=api.url,
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL,
+        file_cache=FileIdCache(),
+        retry_policy=None
+    )
+    yield instance
+    await instance.close()
+
+
+def uploads(api):
+    return [
+        request for request in api.calls('messages/sendFile')
+        if request[0] == 'POST'
+    ]
+
+
+def sent_ids(api):
+    return [
+        dict(request[2]).get('fileId')
+        for request in api.calls('messages/sendFile')
+        if request[0] == 'GET'
+    ]
+
+
+async def test_concurrent_sends_upload_once(api, cached_bot):
+    api.upload_delay = 0.1
+
+    await asyncio.gather(*[
+        cached_bot.send_file(chatId='chat', file_path=b'data')
+        for _ in range(5)
+    ])
+
+    assert len(uploads(api)) == 1
+    assert len(sent_ids(api)) == 4
+    assert len(set(sent_ids(api))) == 1
+
+
+async def test_transient_error_keeps_fileId(api, cached_bot):
+    await cached_bot.send_file(chatId='chat', file_path=b'data')
+    api.fail('messages/sendFile', 500)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await cached_bot.send_file(chatId='chat', file_path=b'data')
+
+    assert len(cached_bot.file_cache) == 1
+    assert len(uploads(api)) == 1
+
+
+async def test_invalid_fileId_is_uploaded_again(api, cached_bot):
+    await cached_bot.send_file(chatId='chat', file_path=b'data')
+    api.fail('messages/sendFile', 400)
+
+    await cached_bot.send_file(chatId='chat', file_path=b'data')
+
+    assert len(uploads(api)) == 2
+    assert len(cached_bot.file_cache) == 1
+
+
+async def test_cache_is_saved_off_the_loop(tmp_path):
+    path = str(tmp_path / 'files.json')
+    cache = FileIdCache(path=path)
+
+    cache.set('file:a', 'id1')
+    cache.set('file:b', 'id2')
+    cache.discard('file:b', 'other')
+    await cache.flush()
+
+    assert FileIdCache(path=path).get('file:b') == 'id2'
+
+    cache.discard('file:b', 'id2')
+    await cache.flush()
+
+    restored = FileIdCache(path=path)
+    assert restored.get('file:a') == 'id1'
+    assert restored.get('file:b') is None
@@ -0,0 +1,109 @@
+import json
+import pickle
+
+import pytest
+
+from async_icq.helpers import InlineKeyboardMarkup, KeyboardButton, \
+    Format, FrozenInlineKeyboardMarkup, FrozenFormat, FrozenStyle
+from async_icq.methods import keyboard_to_json
+
+
+def test_keyboard_json_is_cached_until_mutation():
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='a', callbackData='a'))
+
+    first = keyboard.to_json()
+
+    assert keyboard.to_json() is first
+
+    keyboard.row(KeyboardButton(text='b', callbackData='b'))
+
+    assert keyboard.to_json() != first
+    assert '"b"' in keyboard.to_json()
+
+
+def test_frozen_keyboard_is_immutable_and_hashable():
+    menu = FrozenInlineKeyboardMarkup([
+        [KeyboardButton(text='Yes', callbackData='yes')],
+        [{'text': 'No', 'callbackData': 'no'}]
+    ])
+
+    assert keyboard_to_json(menu) is menu.to_json()
+    assert {menu: 1}[pickle.loads(pickle.dumps(menu))] == 1
+
+    with pytest.raises(AttributeError):
+        menu.row(KeyboardButton(text='Maybe'))
+    with pytest.raises(AttributeError):
+        menu.keyboard = []
+
+
+def test_format_freeze():
+    format_ = Format()
+    format_.add('bold', 0, 5)
+    frozen = format_.freeze()
+
+    format_.add('italic', 1, 2)
+
+    assert frozen == FrozenFormat({'bold': [{'offset': 0, 'length': 5}]})
+    assert json.loads(frozen.to_json()) == \
+        {'bold': [{'offset': 0, 'length': 5}]}
+    assert '"italic"' in format_.to_json()
+
+
+def test_deprecated_attributes_stay_writable_without_stale_json():
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='a', callbackData='a'))
+    keyboard.to_json()
+
+    with pytest.deprecated_call():
+        keyboard.keyboard.append([{'text': 'b'}])
+
+    assert json.loads(keyboard.to_json()) == [
+        [{'text': 'a', 'callbackData': 'a', 'style': 'primary'}],
+        [{'text': 'b'}]
+    ]
+
+    with pytest.deprecated_call():
+        keyboard.keyboard = []
+
+    assert keyboard.to_json() == '[]'
+
+    format_ = Format()
+    format_.add('bold', 0, 5)
+    format_.to_json()
+
+    with pytest.deprecated_call():
+        bold = format_.styles['bold']
+
+    format_.to_json()
+    bold.add(6, 1)
+
+    with pytest.deprecated_call():
+        bold.ranges.append({'offset': 8, 'length': 2})
+
+    assert json.loads(format_.to_json()) == {'bold': [
+        {'offset': 0, 'length': 5},
+        {'offset': 6, 'length': 1},
+        {'offset': 8, 'length': 2}
+    ]}
+
+
+def test_frozen_views_are_built_once():
+    frozen = FrozenFormat({'bold': [{'offset': 0, 'length': 5}]})
+
+    assert frozen.styles is frozen.styles
+    assert frozen.to_dic()['bold'] is frozen.styles['bold']
+
+    with pytest.raises(TypeError):
+        frozen.styles['italic'] = None
+
+
+def test_frozen_equals_only_frozen():
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='a', callbackData='a'))
+    frozen = keyboard.freeze()
+
+    assert frozen != keyboard
+    assert frozen == keyboard.freeze()
+    assert hash(frozen) == hash(keyboard.freeze())
+    assert FrozenInlineKeyboardMarkup() != FrozenStyle()
@@ -0,0 +1,33 @@
+from aiologger.levels import LogLevel
+from aiologger.records import LogRecord
+
+from async_icq.log import RedactingFormatter, LogSampler, log_fields
+
+
+def test_formatter_redacts_token():
+    formatter = RedactingFormatter('%(message)s', secrets=['TOKEN'])
+    record = LogRecord(
+        name='async-icq',
+        level=LogLevel.ERROR,
+        pathname=__file__,
+        lineno=1,
+        msg='GET https://api/?token=TOKEN failed',
+        args=None,
+        exc_info=None
+    )
+    assert formatter.format(record) == 'GET https://api/?token=*** failed'
+
+
+def test_sampler():
+    sampler = LogSampler(0.25)
+    assert [sampler.sample() for _ in range(8)].count(True) == 2
+    assert not LogSampler(0).sample()
+    assert LogSampler(1).sample()
+
+
+def test_log_fields():
+    assert log_fields(
+        'request', path='self/get', status=200, chatId=None, text='a b'
+    ) == "request path=self/get status=200 text='a b'"
+    assert log_fields('event', max_length=3, text='abcdef') == \
+        'event text=abc...'
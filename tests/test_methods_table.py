@@ -0,0 +1,74 @@
+import json
+
+from urllib.parse import parse_qs
+
+from async_icq import methods
+from async_icq.helpers import InlineKeyboardMarkup, KeyboardButton
+
+
+def test_method_build_encodes_params():
+    keyboard = InlineKeyboardMarkup()
+    keyboard.row(KeyboardButton(text='a', callbackData='b'))
+
+    query = methods.SEND_TEXT.build('TOKEN', {
+        'chatId': 'chat',
+        'text': 'hi',
+        'replyMsgId': ['1', '2'],
+        'forwardChatId': None,
+        'inlineKeyboardMarkup': keyboard,
+    })
+
+    assert query[0] == ('token', 'TOKEN')
+    assert ('forwardChatId', None) not in query
+    assert [value for key, value in query if key == 'replyMsgId'] == ['1', '2']
+    assert json.loads(methods.query_value(query, 'inlineKeyboardMarkup')) == \
+        [[{'text': 'a', 'callbackData': 'b', 'style': 'primary'}]]
+
+    query = methods.CREATE_CHAT.build('TOKEN', {
+        'name': 'chat', 'members': ['a@x'], 'public': False
+    })
+
+    assert json.loads(methods.query_value(query, 'members')) == [{'sn': 'a@x'}]
+    assert methods.query_value(query, 'public') == 'false'
+
+
+def test_build_query_for_unknown_method():
+    query = methods.build_query('TOKEN', {
+        'msgId': ['1', '2'], 'flag': True, 'skipped': None
+    })
+
+    assert query == [
+        ('token', 'TOKEN'), ('msgId', '1'), ('msgId', '2'), ('flag', 'true')
+    ]
+    assert methods.METHODS['messages/sendText'] is methods.SEND_TEXT
+
+
+def test_method_split_moves_message_body_to_form():
+    query = methods.SEND_TEXT.build('TOKEN', {
+        'chatId': 'chat', 'text': 'x' * 10, 'replyMsgId': ['1']
+    })
+
+    params, form = methods.SEND_TEXT.split(query)
+
+    assert methods.SEND_TEXT.body_size(query) == 10
+    assert params == [
+        ('token', 'TOKEN'), ('chatId', 'chat'), ('replyMsgId', '1')
+    ]
+    assert form == [('text', 'x' * 10)]
+    assert methods.DELETE_MESSAGES.body == frozenset()
+
+
+async def test_send_text_switches_to_form_above_threshold(api, bot):
+    bot.form_threshold = 100
+
+    await bot.send_text(chatId='chat', text='x' * 99)
+    await bot.send_text(chatId='chat', text='y' * 100)
+
+    short, long_ = api.calls('messages/sendText')
+
+    assert short[0] == 'GET'
+    assert dict(short[2])['text'] == 'x' * 99
+    assert long_[0] == 'POST'
+    assert 'text' not in dict(long_[2])
+    assert dict(long_[2])['chatId'] == 'chat'
+    assert parse_qs(long_[3].decode())['text'] == ['y' * 100]
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.constant import DispatchMode
+from async_icq.events import Event, EventType
+from async_icq.metrics import InMemoryMetrics, PrometheusMetrics, \
+    NULL_METRICS
+
+
+def test_in_memory_snapshot():
+    metrics = InMemoryMetrics(buckets=(0.1, 1.0))
+
+    metrics.inc('bot_events_total', type='newMessage')
+    metrics.inc('bot_events_total', type='newMessage')
+    metrics.set('bot_pending_events', 5)
+    metrics.observe('bot_handler_seconds', 0.05, handler='echo')
+    metrics.observe('bot_handler_seconds', 0.5, handler='echo')
+    metrics.observe('bot_handler_seconds', 5, handler='echo')
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot['counters']['bot_events_total'] == {
+        (('type', 'newMessage'),): 2}
+    assert snapshot['gauges']['bot_pending_events'] == {(): 5}
+
+    histogram = snapshot['histograms']['bot_handler_seconds'][
+        (('handler', 'echo'),)]
+    assert histogram['count'] == 3
+    assert histogram['buckets'] == [(0.1, 1), (1.0, 2)]
+    assert not NULL_METRICS.enabled
+
+
+def test_prometheus_render():
+    metrics = PrometheusMetrics(port=None, buckets=(0.1,))
+
+    metrics.inc('bot_api_responses_total', path='self/get', status='200')
+    metrics.observe('bot_api_request_seconds', 0.05, path='self/get')
+
+    text = metrics.render()
+
+    assert '# TYPE bot_api_responses_total counter' in text
+    assert 'bot_api_responses_total{path="self/get",status="200"} 1' in text
+    assert 'bot_api_request_seconds_bucket{path="self/get",le="0.1"} 1' \
+        in text
+    assert 'bot_api_request_seconds_bucket{path="self/get",le="+Inf"} 1' \
+        in text
+    assert 'bot_api_request_seconds_count{path="self/get"} 1' in text
+    assert metrics.host == '127.0.0.1'
+
+
+@pytest.mark.asyncio
+async def test_handler_metrics_for_partial_and_callable_object():
+    metrics = InMemoryMetrics()
+    bot = AsyncBot(
+        token='TOKEN',
+        loop=asyncio.get_event_loop(),
+        metrics=metrics,
+        log_level=LogLevel.CRITICAL
+    )
+    received = []
+
+    async def echo(prefix, event):
+        received.append(prefix + event.text)
+
+    class Failing(object):
+        async def __call__(self, event):
+            raise RuntimeError('failed')
+
+    bot.add_handler(
+        [functools.partial(echo, '>'), EventType.NEW_MESSAGE, None])
+    bot.add_handler([Failing(), EventType.NEW_MESSAGE, None])
+
+    await bot.handle_event(Event(
+        type_=EventType.NEW_MESSAGE,
+        data={'text': 'text', 'chat': {'chatId': 'chat', 'type': 'private'}},
+        bot=bot
+    ))
+
+    snapshot = metrics.snapshot()
+
+    assert received == ['>text']
+    assert set(snapshot['histograms']['bot_handler_seconds']) == {
+        (('handler', 'echo'),), (('handler', 'Failing'),)}
+    assert snapshot['counters']['bot_handler_errors_total'] == {
+        (('handler', 'Failing'),): 1}
+
+
+@pytest.mark.asyncio
+async def test_queue_gauges_count_per_chat_handlers(make_event):
+    metrics = InMemoryMetrics()
+    bot = AsyncBot(
+        token='TOKEN',
+        loop=asyncio.get_event_loop(),
+        metrics=metrics,
+        log_level=LogLevel.CRITICAL,
+        dispatch_mode=DispatchMode.PER_CHAT
+    )
+    release = asyncio.Event()
+
+    @bot.message_handler()
+    async def wait(event):
+        await release.wait()
+
+    await bot.dispatch_events([
+        make_event(eventId, chatId=f'chat{eventId % 5}')
+        for eventId in range(7)
+    ])
+    await asyncio.sleep(0.01)
+    bot.observe_queues()
+
+    gauges = metrics.snapshot()['gauges']
+
+    assert gauges['bot_handlers_in_flight'] == {(): 5}
+    assert gauges['bot_handlers_pending'] == {(): 2}
+
+    release.set()
+    await bot.dispatcher.drain()
+    bot.observe_queues()
+
+    assert metrics.snapshot()['gauges']['bot_handlers_in_flight'] == {(): 0}
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.parametrize('prefetch, polls', [(True, 2), (False, 1)])
+async def test_next_poll_runs_while_batch_is_handled(api, bot, prefetch, polls):
+    bot.prefetch_events = prefetch
+    api.push('TOKEN', 'newMessage', {'text': 'a'})
+    batches = []
+
+    async def callback(events):
+        if not batches:
+            # Пока пачка разбирается, следующий long-poll уже отправлен
+            await asyncio.sleep(0.03)
+            bot.stop()
+        batches.append((len(events), len(api.calls('events/get'))))
+
+    async with bot:
+        await asyncio.wait_for(bot.poll_events(callback), 5)
+
+    assert batches[0] == (1, polls)
+    assert bot.lastEventId == 1
+
+
+async def test_prefetched_events_are_handled_on_stop(api, bot):
+    api.push('TOKEN', 'newMessage', {'text': 'a'})
+    batches = []
+
+    async def callback(events):
+        batches.append([event['eventId'] for event in events])
+        if len(batches) == 1:
+            api.push('TOKEN', 'newMessage', {'text': 'b'})
+            bot.stop()
+            await asyncio.sleep(0.1)
+
+    async with bot:
+        await asyncio.wait_for(bot.poll_events(callback), 5)
+
+    assert batches == [[1], [2]]
+    assert bot.lastEventId == 2
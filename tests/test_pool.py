@@ -0,0 +1,71 @@
+import asyncio
+
+from aiologger.levels import LogLevel
+
+from async_icq.events import EventType
+from async_icq.metrics import InMemoryMetrics
+from async_icq.middleware import BaseBotMiddleware
+from async_icq.pool import BotPool
+
+
+class RecordingMiddleware(BaseBotMiddleware):
+
+    def __init__(self):
+        self.event_types = {EventType.NEW_MESSAGE}
+        self.checked = []
+
+    async def check(self, event) -> bool:
+        self.checked.append((self.bot.token, event.bot.token))
+        return False
+
+
+class StartedMetrics(InMemoryMetrics):
+
+    __slots__ = (
+        "started",
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.started = 0
+
+    async def start(self):
+        self.started += 1
+
+
+async def test_pool_binds_events_and_middlewares_to_own_bot(
+        api, make_payload):
+    middleware = RecordingMiddleware()
+    metrics = StartedMetrics()
+    pool = BotPool(
+        loop=asyncio.get_event_loop(),
+        url=api.url,
+        pollTime=1,
+        log_level=LogLevel.CRITICAL,
+        middlewares=[middleware],
+        metrics=metrics
+    )
+
+    received = []
+
+    async def handler(event):
+        received.append((event.bot.token, event.text))
+        if len(received) == 2:
+            pool.stop()
+
+    for token in ('A', 'B'):
+        pool.add_bot(token)
+    pool.add_handler([handler, EventType.NEW_MESSAGE, None])
+
+    api.push('A', 'newMessage', make_payload('to A'))
+    api.push('B', 'newMessage', make_payload('to B'))
+
+    await asyncio.wait_for(pool.run(), 5)
+
+    assert sorted(received) == [('A', 'to A'), ('B', 'to B')]
+    first, second = [bot.middlewares[0] for bot in pool]
+    assert (first.bot.token, second.bot.token) == ('A', 'B')
+    assert BaseBotMiddleware.bot is None
+    # Middleware видит бот, получивший событие
+    assert sorted(middleware.checked) == [('A', 'A'), ('B', 'B')]
+    assert metrics.started == 2
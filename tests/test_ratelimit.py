@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from async_icq.constant import RequestPriority
+from async_icq.ratelimit import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_global_rate():
+
+    limiter = RateLimiter(rate=100, burst=1, chat_rate=None)
+
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+
+    await asyncio.gather(*[
+        limiter.acquire('messages/sendText', str(i)) for i in range(11)
+    ])
+
+    assert loop.time() - started >= 0.09
+    assert limiter.stats()['requests'] == 11
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_priority():
+
+    limiter = RateLimiter(rate=50, burst=1, chat_rate=None)
+
+    order = []
+
+    async def request(path, name, priority=None):
+        if priority is not None:
+            with limiter.priority(priority):
+                await limiter.acquire(path)
+        else:
+            await limiter.acquire(path)
+        order.append(name)
+
+    tasks = [
+        asyncio.ensure_future(
+            request('messages/sendText', f'bulk{i}', RequestPriority.BULK))
+        for i in range(5)
+    ]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.ensure_future(
+        request('messages/answerCallbackQuery', 'callback')))
+
+    await asyncio.gather(*tasks)
+
+    assert order.index('callback') <= 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_per_chat():
+
+    limiter = RateLimiter(rate=None, chat_rate=20, chat_burst=1)
+
+    order = []
+
+    async def request(chat_id):
+        await limiter.acquire('messages/sendText', chat_id)
+        order.append(chat_id)
+
+    await asyncio.gather(*[request(chat_id) for chat_id in 'aab'])
+
+    assert order == ['a', 'b', 'a']
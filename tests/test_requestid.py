@@ -0,0 +1,23 @@
+from async_icq.bot import AsyncBot
+from async_icq.requestid import DEFAULT_REQUEST_IDS, RequestIdGenerator
+
+
+def test_request_ids_are_lazy_and_unique():
+    generator = RequestIdGenerator(prefix='bot')
+
+    first, second = generator.next(), generator.next()
+
+    assert first._text is None
+    assert str(first) == 'bot-1'
+    assert str(second) == 'bot-2'
+    assert first != second
+    assert RequestIdGenerator().prefix != RequestIdGenerator().prefix
+
+
+def test_get_request_id_works_on_class_and_instance():
+    bot = AsyncBot.__new__(AsyncBot)
+    bot.request_ids = RequestIdGenerator(prefix='bot')
+
+    assert str(bot.get_request_id()) == 'bot-1'
+    assert AsyncBot.get_request_id().prefix == DEFAULT_REQUEST_IDS.prefix
+    assert str(AsyncBot.get_request_id())
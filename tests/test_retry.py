@@ -0,0 +1,111 @@
+import asyncio
+import ssl
+
+import aiohttp
+import pytest
+
+from async_icq.retry import CircuitBreaker, RetryPolicy
+
+
+@pytest.fixture
+def policy(bot):
+    bot.retry_policy = RetryPolicy(max_attempts=3, base_delay=0, jitter=False)
+    return bot.retry_policy
+
+
+async def test_idempotent_request_is_retried(api, bot, policy):
+    api.fail('self/get', 503, times=2)
+
+    response = await bot.self_get()
+
+    assert response.status == 200
+    assert len(api.calls('self/get')) == 3
+
+
+async def test_retries_are_limited(api, bot, policy):
+    api.fail('self/get', 503, times=3)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await bot.self_get()
+
+    assert len(api.calls('self/get')) == 3
+
+
+async def test_non_idempotent_request_retried_only_on_429(api, bot, policy):
+    api.fail('messages/sendText', 500)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        await bot.send_text(chatId='chat', text='hi')
+
+    assert len(api.calls('messages/sendText')) == 1
+
+    api.fail('messages/sendText', 429, headers={'Retry-After': '0'})
+
+    await bot.send_text(chatId='chat', text='hi')
+
+    assert len(api.calls('messages/sendText')) == 3
+
+
+def test_retry_after_header_caps_delay():
+    policy = RetryPolicy(max_delay=5.0, jitter=False)
+    error = aiohttp.ClientResponseError(
+        None, (), status=429, headers={'Retry-After': '60'})
+
+    assert policy.retry_after(error, 0) == 5.0
+    assert policy.backoff(3) == 4.0
+
+
+def test_circuit_breaker_opens_and_resets():
+    breaker = CircuitBreaker(
+        failure_threshold=2,
+        reset_timeout=10.0,
+        policy=RetryPolicy(base_delay=1.0, jitter=False)
+    )
+
+    assert breaker.failure() == 1.0
+    assert not breaker.is_open
+    assert breaker.failure() == 10.0
+    assert breaker.is_open
+
+    breaker.success()
+
+    assert not breaker.is_open
+
+
+async def test_failed_polls_back_off(api, bot):
+    bot.poll_breaker = CircuitBreaker(
+        failure_threshold=2,
+        reset_timeout=0.05,
+        policy=RetryPolicy(base_delay=0.01, jitter=False)
+    )
+    api.fail('events/get', 500, times=2)
+    api.push('TOKEN', 'newMessage', {'text': 'a'})
+    batches = []
+
+    async def callback(events):
+        batches.append(events)
+        bot.stop()
+
+    async with bot:
+        await asyncio.wait_for(bot.poll_events(callback), 5)
+
+    assert len(api.calls('events/get')) == 3
+    assert len(batches[0]) == 1
+    assert bot.poll_breaker.failures == 0
+
+
+def test_certificate_errors_are_not_retried():
+    policy = RetryPolicy()
+    key = aiohttp.client_reqrep.ConnectionKey(
+        'api', 443, True, True, None, None, None)
+    certificate = aiohttp.ClientConnectorCertificateError(
+        key, ssl.SSLCertVerificationError('certificate verify failed'))
+    refused = aiohttp.ClientConnectorError(
+        key, ConnectionRefusedError('refused'))
+
+    handshake = aiohttp.ClientConnectorSSLError(
+        key, ssl.SSLError('handshake failed'))
+
+    assert not policy.should_retry('self/get', certificate, 0)
+    assert not policy.should_retry('self/get', handshake, 0)
+    assert policy.should_retry('messages/sendText', refused, 0)
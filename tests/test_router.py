@@ -0,0 +1,50 @@
+from async_icq.events import EventType
+from async_icq.router import Router
+
+
+async def any_message(event):
+    pass
+
+
+async def start(event):
+    pass
+
+
+async def start_admin(event):
+    pass
+
+
+async def edited(event):
+    pass
+
+
+def test_router_matches_in_registration_order(make_message):
+
+    handlers = [
+        [start_admin, EventType.NEW_MESSAGE, '/start admin'],
+        [any_message, EventType.NEW_MESSAGE, None],
+        [start, EventType.NEW_MESSAGE, '/start'],
+        [edited, EventType.EDITED_MESSAGE, None],
+    ]
+
+    router = Router(handlers)
+
+    assert router.match(make_message('/start admin')) == [
+        start_admin, any_message, start]
+    assert router.match(make_message('/start')) == [any_message, start]
+    assert router.match(make_message('/stop')) == [any_message]
+    assert router.match(make_message(None)) == [any_message]
+
+
+def test_router_invalidate(make_message):
+
+    handlers = [[start, EventType.NEW_MESSAGE, '/start']]
+
+    router = Router(handlers)
+
+    assert router.match(make_message('hello')) == []
+
+    handlers.append([any_message, EventType.NEW_MESSAGE, None])
+    router.invalidate()
+
+    assert router.match(make_message('hello')) == [any_message]
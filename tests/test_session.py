@@ -0,0 +1,47 @@
+import asyncio
+
+import aiohttp
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+
+
+async def test_sessions_are_reused_and_closed(api, bot):
+    async with bot:
+        session = bot.session
+
+        await bot.self_get()
+        await bot.get_events()
+
+        assert await bot.start_session() is session
+        assert bot.poll_session is not session
+        assert bot.poll_session.connector is not session.connector
+        assert bot.poll_session.connector.limit == 1
+
+        connectors = [session.connector, bot.poll_session.connector]
+
+    assert bot.session is None and bot.poll_session is None
+    assert session.closed
+    assert all(connector.closed for connector in connectors)
+
+
+async def test_shared_connector_is_not_closed(api):
+    connector = aiohttp.TCPConnector(limit=5)
+    instance = AsyncBot(
+        token='TOKEN',
+        url=api.url,
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL,
+        connector=connector
+    )
+
+    try:
+        async with instance:
+            await instance.self_get()
+            assert instance.session.connector is connector
+
+        assert not connector.closed
+        assert api.calls('self/get')
+    finally:
+        await connector.close()
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from async_icq import bot as bot_module
+from async_icq.bot import upload_form
+
+
+def uploaded(api, path='messages/sendFile'):
+    return [request[3] for request in api.calls(path) if request[0] == 'POST']
+
+
+async def test_file_path_is_streamed_and_closed(
+        api, bot, tmp_path, monkeypatch):
+    path = tmp_path / 'report.bin'
+    path.write_bytes(api.file_data)
+    opened = []
+
+    def open_file(filepath):
+        opened.append(open(filepath, 'rb'))
+        return opened[-1]
+
+    monkeypatch.setattr(bot_module, 'open_file', open_file)
+
+    await bot.send_file(chatId='chat', file_path=str(path), caption='x')
+
+    body, = uploaded(api)
+    assert api.file_data in body
+    assert b'filename="report.bin"' in body
+    assert opened[0].closed
+
+
+async def test_async_iterator_is_uploaded(api, bot):
+    async def chunks():
+        for i in range(0, len(api.file_data), 1000):
+            yield api.file_data[i:i + 1000]
+
+    await bot.send_voice(
+        chatId='chat', file_path=chunks(), filename='voice.ogg')
+
+    body, = uploaded(api, 'messages/sendVoice')
+    assert api.file_data in body
+    assert b'filename="voice.ogg"' in body
+
+
+async def test_file_object_is_not_closed(api, bot):
+    f = io.BytesIO(b'data')
+    f.name = '/tmp/note.txt'
+
+    await bot.send_file(chatId='chat', file_path=f)
+
+    body, = uploaded(api)
+    assert b'filename="note.txt"' in body
+    assert not f.closed
+
+
+async def test_unsupported_input_is_rejected():
+    with pytest.raises(ValueError):
+        await upload_form(42)
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.webhook import WebhookServer, FakeGateway
+
+
+@pytest.mark.asyncio
+async def test_webhook_dispatches_pushed_events(make_payload):
+    bot = AsyncBot(token='TOKEN', loop=asyncio.get_event_loop())
+    received = []
+
+    @bot.message_handler()
+    async def handler(event):
+        received.append(event.text)
+
+    server = WebhookServer(bot, host='127.0.0.1', port=0, secret='secret')
+    await server.start()
+
+    try:
+        async with FakeGateway(server.url, secret='secret') as gateway:
+            response = await gateway.push([
+                gateway.event('newMessage', make_payload('one')),
+                gateway.event('newMessage', make_payload('two'))
+            ])
+            assert response == {'ok': True}
+
+        async with FakeGateway(server.url, secret='wrong') as gateway:
+            response = await gateway.push([
+                gateway.event('newMessage', make_payload('three'))
+            ])
+            assert response['ok'] is False
+
+        await bot.dispatcher.drain()
+    finally:
+        await server.stop()
+
+    assert received == ['one', 'two']
+    assert bot.lastEventId == 2
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_invalid_events(make_payload):
+    bot = AsyncBot(
+        token='TOKEN',
+        loop=asyncio.get_event_loop(),
+        log_level=LogLevel.CRITICAL
+    )
+    received = []
+
+    @bot.message_handler()
+    async def handler(event):
+        received.append(event.text)
+
+    with pytest.raises(ValueError):
+        WebhookServer(bot, host='0.0.0.0')
+
+    server = WebhookServer(bot, port=0)
+    await server.start()
+
+    try:
+        async with FakeGateway(server.url) as gateway:
+            for events in (
+                    [gateway.event('bogus', make_payload('bad'))],
+                    [{'type': 'newMessage', 'payload': make_payload('bad')}],
+                    [gateway.event('newMessage', make_payload('ok')), 'bad']
+            ):
+                response = await gateway.push(events)
+                assert response['ok'] is False
+
+            response = await gateway.push([
+                gateway.event('newMessage', make_payload('good'))
+            ])
+            assert response == {'ok': True}
+
+        await bot.dispatcher.drain()
+    finally:
+        await server.stop()
+
+    assert received == ['good']
+    assert bot.queue_depth == 0
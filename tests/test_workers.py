@@ -0,0 +1,101 @@
+import asyncio
+import signal
+import threading
+
+import pytest
+
+from aiologger.levels import LogLevel
+
+from async_icq.bot import AsyncBot
+from async_icq.checkpoint import Checkpointer, FileCheckpointStore
+from async_icq.workers import WorkerPool
+
+from conftest import FakeApi
+
+
+def test_shard_keeps_chat_on_one_worker(make_payload):
+    pool = WorkerPool(AsyncBot(token='TOKEN'), processes=4)
+
+    shards = {pool.shard(make_payload(chatId=f'chat{i}')) for i in range(100)}
+    assert shards == {0, 1, 2, 3}
+
+    callback = {'queryId': '1', 'message': {'chat': {'chatId': 'chat7'}}}
+    assert pool.shard(callback) == pool.shard(make_payload(chatId='chat7'))
+    assert pool.shard({'userId': 'user'}) == 0
+
+
+@pytest.fixture
+def alarm():
+    # Зависший процесс поллинга прерывается, а не вешает тесты
+    def timeout(signum, frame):
+        raise TimeoutError('worker pool did not stop')
+
+    previous = signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(10)
+    yield
+    signal.alarm(0)
+    signal.signal(signal.SIGALRM, previous)
+
+
+@pytest.fixture
+def threaded_api():
+    # Сервер работает в своем потоке: event loop бота должен принадлежать
+    # только боту, как при обычном запуске start_poll(processes=...)
+    api = FakeApi()
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(api.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    started.wait(5)
+    api.loop = loop
+    yield api
+    asyncio.run_coroutine_threadsafe(api.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+@pytest.mark.parametrize('with_checkpoint', [True, False])
+def test_pool_handles_events_and_stops(
+        tmp_path, alarm, threaded_api, with_checkpoint, make_payload):
+    api = threaded_api
+    path = str(tmp_path / 'checkpoint.json')
+    bot = AsyncBot(
+        token='TOKEN',
+        url=api.url,
+        log_level=LogLevel.CRITICAL,
+        pollTime=1,
+        checkpoint=Checkpointer(FileCheckpointStore(path), batch_size=1)
+        if with_checkpoint else None
+    )
+
+    @bot.message_handler()
+    async def echo(event):
+        await event.answer(event.text)
+
+    for i in range(20):
+        api.push('TOKEN', 'newMessage', make_payload(chatId=f'chat{i}'))
+
+    async def stop_when_answered():
+        while len(api.calls('messages/sendText')) < 20:
+            await asyncio.sleep(0.01)
+        bot.stop()
+
+    stopper = asyncio.run_coroutine_threadsafe(stop_when_answered(), api.loop)
+
+    try:
+        WorkerPool(bot, processes=2).start()
+    finally:
+        bot.loop.close()
+
+    assert stopper.done()
+    assert len(api.calls('messages/sendText')) == 20
+    if with_checkpoint:
+        assert FileCheckpointStore(path).load() == (20, [])